@@ -1,11 +1,32 @@
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from langchain_community.utilities import SQLDatabase
+from app.db.schema_snapshot import load_sql_database
+from app.db.pool_metrics import PoolMetrics, PoolMetricsHook, InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
 from dotenv import load_dotenv
+from typing import Dict, Any
 import os
 
 load_dotenv()
 
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes")
+
+
+# recycle di bawah wait_timeout MySQL supaya koneksi idle tidak basi
+def pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true"),
+    }
+
+
 class DBService:
     def __init__(self):
         self.DB_USER = os.getenv("DB_USER")
@@ -14,16 +35,58 @@ class DBService:
         self.DB_HOST = os.getenv("DB_HOST")
         self.DB_PORT = os.getenv("DB_PORT")
         self.mysql_url = f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
-        self.engine = create_engine(self.mysql_url, echo=False)
+        self.pool_options = pool_options()
+
+        self.engine = create_engine(self.mysql_url, echo=False, poolclass=InstrumentedQueuePool, **self.pool_options)
+        self.engine.pool.metrics = PoolMetrics("sync")
+
+        # engine async opsional (aiomysql di produksi, mis. sqlite+aiosqlite:///... untuk uji lokal)
+        self.async_enabled = _env_bool("DB_ASYNC_ENABLED", "false")
+        self.async_url = os.getenv("DB_ASYNC_URL") or f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        self.async_engine = None
+        if self.async_enabled:
+            self.async_engine = create_async_engine(
+                self.async_url, echo=False, poolclass=InstrumentedAsyncQueuePool, **self.pool_options
+            )
+            self.async_engine.sync_engine.pool.metrics = PoolMetrics("async")
         
     def get_sql_database(self):
-        db = SQLDatabase.from_uri(self.mysql_url)
-        return db
+        # pakai engine yang sama supaya pengaturan pool berlaku juga untuk chain SQL
+        if not _env_bool("SCHEMA_SNAPSHOT_ENABLED", "true"):
+            return SQLDatabase(self.engine)
+
+        try:
+            return load_sql_database(self.engine)
+        except Exception as e:
+            print(f"⚠️ Snapshot skema gagal, fallback ke introspeksi langsung: {e}")
+            return SQLDatabase(self.engine)
+
+    def _pools(self):
+        pools = [self.engine.pool]
+        if self.async_engine is not None:
+            pools.append(self.async_engine.sync_engine.pool)
+        return pools
+
+    def add_pool_metrics_hook(self, hook: PoolMetricsHook) -> None:
+        # hook dipanggil dengan snapshot statistik setiap checkout koneksi
+        for pool in self._pools():
+            pool.metrics.add_hook(hook)
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {pool.metrics.name: pool.metrics.snapshot(pool) for pool in self._pools()}
     
     def get_session(self):
         with Session(self.engine) as session:
             yield session
             
+    async def get_async_session(self):
+        if self.async_engine is None:
+            raise RuntimeError("Engine async tidak aktif, set DB_ASYNC_ENABLED=true")
+
+        # expire_on_commit=False: atribut tetap bisa dibaca tanpa lazy load setelah commit
+        async with AsyncSession(self.async_engine, expire_on_commit=False) as session:
+            yield session
+            
     def create_db_and_tables(self):
         SQLModel.metadata.create_all(self.engine)
         
@@ -1,14 +1,19 @@
-from typing import Optional, List, Tuple
+import os
+import time
+import asyncio
+import threading
+from typing import Optional, List, Tuple, Dict
 from decimal import Decimal
 from sqlmodel import SQLModel, Field, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import Column, String, Index
 from sqlalchemy.types import Numeric
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process 
+from app.helper.fuzzy_index import BigramIndex
+from app.db.table_versions import get_table_versions
 
 
-_CACHED_PANGAN_NAMES: Optional[List[str]] = None
-
 class FoodIngredient(SQLModel, table=True):
     __tablename__ = "pangan"
     __table_args__ = (
@@ -42,43 +47,147 @@ class FoodIngredient(SQLModel, table=True):
 FUZZY_SCORE_THRESHOLD = 80
 
 
-def _load_pangan_names(session: Session) -> List[str]:
-    global _CACHED_PANGAN_NAMES
-    
-    if _CACHED_PANGAN_NAMES is not None:
-        return _CACHED_PANGAN_NAMES
-    
-    print("⏳ [CACHE MISS] Loading all Pangan names from DB...")
-    statement_names = select(FoodIngredient.nama_pangan)
-    all_pangan_names: List[str] = session.exec(statement_names).all()
-    
-    _CACHED_PANGAN_NAMES = all_pangan_names
-    return all_pangan_names
+PANGAN_CATALOG_TTL = int(os.getenv("PANGAN_CATALOG_TTL", "900"))
+
+
+# Katalog pangan satu proses: seluruh baris FoodIngredient (detached) diindeks per id
+# dan per nama, plus BigramIndex untuk fuzzy matching. Refresh saat TTL habis atau
+# setelah invalidate() (mis. dipanggil InsertPangan).
+class PanganCatalog:
+    def __init__(self, ttl_seconds: int = PANGAN_CATALOG_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+
+        self._by_id: Dict[int, FoodIngredient] = {}
+        self._by_name: Dict[str, FoodIngredient] = {}
+        self._names: List[str] = []
+        self._index: Optional[BigramIndex] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.ttl_seconds > 0 and time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def _rebuild(self, rows: List[FoodIngredient]) -> None:
+        by_id: Dict[int, FoodIngredient] = {}
+        by_name: Dict[str, FoodIngredient] = {}
+        for row in rows:
+            by_id[row.id_pangan] = row
+            # sama seperti .first() sebelumnya: baris pertama menang bila nama duplikat
+            by_name.setdefault(row.nama_pangan, row)
 
+        names = [row.nama_pangan for row in rows]
+        index = BigramIndex(names, min_score=FUZZY_SCORE_THRESHOLD)
 
-def get_pangan_by_nama_fuzzy(nama_pangan: str, session: Session) -> Optional[FoodIngredient]:
-    
-    all_pangan_names = _load_pangan_names(session)
+        self._by_id = by_id
+        self._by_name = by_name
+        self._names = names
+        self._index = index
+        self._loaded_at = time.monotonic()
+        self.version += 1
 
-    if not all_pangan_names:
-        return None
+    def ensure_loaded(self, session: Session) -> "PanganCatalog":
+        if not self.is_stale():
+            return self
 
-    best_match: Optional[Tuple[str, int]] = process.extractOne(
-        nama_pangan, 
-        all_pangan_names, 
-        scorer=fuzz.token_set_ratio 
-    )
+        with self._lock:
+            if not self.is_stale():
+                return self
 
-    if best_match is None:
-        return None
+            print("⏳ [CACHE MISS] Loading Pangan catalog from DB...")
+            # session terpisah supaya baris katalog tidak ikut di-expire commit milik request
+            with Session(session.get_bind()) as catalog_session:
+                statement = select(FoodIngredient).order_by(FoodIngredient.id_pangan)
+                rows: List[FoodIngredient] = catalog_session.exec(statement).all()
+                catalog_session.expunge_all()
 
-    best_name, score = best_match
+            self._rebuild(rows)
+        return self
+
+    async def ensure_loaded_async(self, session: AsyncSession) -> "PanganCatalog":
+        if not self.is_stale():
+            return self
+
+        async with self._async_lock:
+            if not self.is_stale():
+                return self
+
+            print("⏳ [CACHE MISS] Loading Pangan catalog from DB (async)...")
+            async with AsyncSession(session.bind) as catalog_session:
+                statement = select(FoodIngredient).order_by(FoodIngredient.id_pangan)
+                rows: List[FoodIngredient] = (await catalog_session.exec(statement)).all()
+                catalog_session.expunge_all()
+
+            self._rebuild(rows)
+        return self
+
+    def rows(self, session: Session) -> List[FoodIngredient]:
+        self.ensure_loaded(session)
+        return list(self._by_id.values())
+
+    def get_by_id(self, id_pangan: int, session: Session) -> Optional[FoodIngredient]:
+        self.ensure_loaded(session)
+        return self._by_id.get(id_pangan)
+
+    def get_by_name(self, nama_pangan: str, session: Session) -> Optional[FoodIngredient]:
+        self.ensure_loaded(session)
+        return self._by_name.get(nama_pangan)
+
+    def _match_loaded(self, nama_pangan: str) -> Optional[FoodIngredient]:
+        # index bigram membuang nama yang mustahil mencapai threshold,
+        # hasil extractOne pada shortlist identik dengan scan penuh
+        candidate_names = self._index.candidates(nama_pangan)
+
+        if not candidate_names:
+            return None
+
+        best_match: Optional[Tuple[str, int]] = process.extractOne(
+            nama_pangan, 
+            candidate_names, 
+            scorer=fuzz.token_set_ratio 
+        )
+
+        if best_match is None:
+            return None
+
+        best_name, score = best_match
+
+        if score >= FUZZY_SCORE_THRESHOLD: 
+            return self._by_name.get(best_name)
+        else:
+            return None
+
+    def match_fuzzy(self, nama_pangan: str, session: Session) -> Optional[FoodIngredient]:
+        self.ensure_loaded(session)
+        return self._match_loaded(nama_pangan)
+
+    async def match_fuzzy_async(self, nama_pangan: str, session: AsyncSession) -> Optional[FoodIngredient]:
+        await self.ensure_loaded_async(session)
+        # extractOne murni CPU, jangan menahan event loop
+        return await asyncio.to_thread(self._match_loaded, nama_pangan)
+
+
+_PANGAN_CATALOG = PanganCatalog()
+
+
+def get_pangan_catalog() -> PanganCatalog:
+    return _PANGAN_CATALOG
+
+
+def get_pangan_by_nama_fuzzy(nama_pangan: str, session: Session) -> Optional[FoodIngredient]:
+    return _PANGAN_CATALOG.match_fuzzy(nama_pangan, session)
+
+
+async def get_pangan_by_nama_fuzzy_async(nama_pangan: str, session: AsyncSession) -> Optional[FoodIngredient]:
+    return await _PANGAN_CATALOG.match_fuzzy_async(nama_pangan, session)
 
-    if score >= FUZZY_SCORE_THRESHOLD: 
-        statement = select(FoodIngredient).where(FoodIngredient.nama_pangan == best_name)
-        return session.exec(statement).first()
-    else:
-        return None
 
 def get_pangan_by_nama_like(nama_pangan: str, session: Session) -> Optional[List['FoodIngredient']]:
     search_pattern = f"%{nama_pangan}%"
@@ -97,4 +206,6 @@ def InsertPangan(pangan: FoodIngredient, session: Session) -> FoodIngredient:
     session.add(pangan)
     session.commit()
     session.refresh(pangan)
-    return pangan
\ No newline at end of file
+    _PANGAN_CATALOG.invalidate()
+    get_table_versions().bump(FoodIngredient.__tablename__)
+    return pangan
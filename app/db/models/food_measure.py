@@ -0,0 +1,55 @@
+import os
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.db.table_versions import get_table_versions
+
+
+# kolom nama satuan (kg, ons, liter, butir, ...) di tabel takaran
+TAKARAN_NAME_COLUMN = os.getenv("TAKARAN_NAME_COLUMN", "nama_takaran")
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+# id_takaran -> nama satuan, dibaca ulang saat versi tabel takaran berubah
+class TakaranNames:
+    def __init__(self, name_column: str = TAKARAN_NAME_COLUMN):
+        self.name_column = name_column
+        self._names: Dict[int, str] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _check_column(self, engine: Engine) -> None:
+        columns = {column["name"] for column in inspect(engine).get_columns("takaran")}
+        if self.name_column not in columns:
+            raise RuntimeError(
+                f"Kolom takaran.{self.name_column} tidak ditemukan (kolom yang ada: "
+                f"{', '.join(sorted(columns))}); set TAKARAN_NAME_COLUMN ke kolom nama satuan"
+            )
+
+    def load(self, engine: Engine) -> Dict[int, str]:
+        version = get_table_versions().version("takaran")
+        with self._lock:
+            if self._version == version:
+                return self._names
+
+            self._check_column(engine)
+            statement = text(f"SELECT id_takaran, {_quote(self.name_column)} FROM takaran")
+            with engine.connect() as conn:
+                rows = conn.execute(statement).all()
+
+            self._names = {int(id_takaran): name for id_takaran, name in rows if name is not None}
+            self._version = version
+            return self._names
+
+
+_TAKARAN_NAMES = TakaranNames()
+
+
+def get_takaran_names(engine: Engine) -> Dict[int, str]:
+    return _TAKARAN_NAMES.load(engine)
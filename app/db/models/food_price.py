@@ -0,0 +1,234 @@
+import os
+import time
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional, List, Dict, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.db.table_versions import get_table_versions
+
+
+PRICE_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("PRICE_SNAPSHOT_REFRESH_SECONDS", "5"))
+PRICE_SNAPSHOT_FULL_REFRESH_SECONDS = float(os.getenv("PRICE_SNAPSHOT_FULL_REFRESH_SECONDS", "3600"))
+# jendela updated_at yang dibaca ulang setiap refresh, menampung commit yang datang terlambat
+PRICE_SNAPSHOT_OVERLAP_SECONDS = float(os.getenv("PRICE_SNAPSHOT_OVERLAP_SECONDS", "300"))
+
+# sekali saat load penuh: harga terbaru per pangan + watermark id_harga
+LATEST_PRICE_SQL = """
+WITH hp_rank AS (
+  SELECT
+    id_harga,
+    id_pangan,
+    harga_satuan,
+    tanggal,
+    ROW_NUMBER() OVER (
+      PARTITION BY id_pangan
+      ORDER BY tanggal DESC, id_harga DESC
+    ) AS rn
+  FROM harga_pangan
+)
+SELECT h.id_harga, h.id_pangan, p.nama_pangan, h.harga_satuan, h.tanggal
+FROM pangan p
+JOIN hp_rank h
+  ON h.id_pangan = p.id_pangan AND h.rn = 1
+"""
+
+WATERMARK_SQL = "SELECT COALESCE(MAX(id_harga), 0), MAX(updated_at) FROM harga_pangan"
+MAX_PRICE_ID_SQL = "SELECT COALESCE(MAX(id_harga), 0), NULL FROM harga_pangan"
+
+# incremental: baris baru (id_harga > watermark) dan baris yang diubah/di-commit
+# terlambat (updated_at >= watermark - overlap). Dua range scan (PRIMARY dan
+# PRICE_UPDATED_AT_INDEX) digabung UNION; dengan OR MySQL memilih full scan.
+CHANGED_PRICES_SQL = """
+SELECT h.id_harga, h.id_pangan, p.nama_pangan, h.harga_satuan, h.tanggal, h.updated_at
+FROM harga_pangan h
+JOIN pangan p ON p.id_pangan = h.id_pangan
+WHERE h.id_harga > :last_id
+UNION
+SELECT h.id_harga, h.id_pangan, p.nama_pangan, h.harga_satuan, h.tanggal, h.updated_at
+FROM harga_pangan h
+JOIN pangan p ON p.id_pangan = h.id_pangan
+WHERE h.updated_at >= :since
+ORDER BY id_harga
+"""
+
+# index untuk cabang updated_at di atas dan MAX(updated_at) di WATERMARK_SQL. Tidak ada
+# migrasi di repo ini, jadi dibuat saat load penuh pertama jika belum ada (butuh hak
+# ALTER/INDEX; jika gagal, tetap jalan dengan peringatan). Set
+# PRICE_UPDATED_AT_INDEX_AUTO=false jika DDL dikelola di luar aplikasi:
+#   CREATE INDEX idx_harga_pangan_updated_at ON harga_pangan (updated_at)
+PRICE_UPDATED_AT_INDEX = "idx_harga_pangan_updated_at"
+PRICE_UPDATED_AT_INDEX_AUTO = os.getenv("PRICE_UPDATED_AT_INDEX_AUTO", "true").strip().lower() in ("1", "true", "yes")
+
+UPDATED_AT_INDEX_EXISTS_SQL = """
+SELECT COUNT(*)
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'harga_pangan'
+  AND COLUMN_NAME = 'updated_at' AND SEQ_IN_INDEX = 1
+"""
+CREATE_UPDATED_AT_INDEX_SQL = f"CREATE INDEX {PRICE_UPDATED_AT_INDEX} ON harga_pangan (updated_at)"
+
+# untuk tabel tanpa kolom updated_at: hanya watermark id_harga
+NEW_PRICES_SQL = """
+SELECT h.id_harga, h.id_pangan, p.nama_pangan, h.harga_satuan, h.tanggal, NULL
+FROM harga_pangan h
+JOIN pangan p ON p.id_pangan = h.id_pangan
+WHERE h.id_harga > :last_id
+ORDER BY h.id_harga
+"""
+
+
+class LatestPrice(NamedTuple):
+    id_harga: int
+    id_pangan: int
+    nama: str
+    harga: Decimal
+    tanggal: date
+
+
+# Harga terbaru per pangan di memori proses. Load penuh sekali (window query), lalu
+# setiap refresh hanya membaca baris harga_pangan baru (id_harga > watermark) atau yang
+# updated_at-nya dalam PRICE_SNAPSHOT_OVERLAP_SECONDS dari updated_at terbesar yang
+# pernah dilihat, sehingga UPDATE dan insert yang di-commit tidak urut id ikut terbaca.
+# version naik setiap kali isi snapshot berubah, dipakai sebagai kunci cache.
+# DELETE (dan UPDATE tanpa menyentuh updated_at) tidak terlihat oleh watermark: snapshot
+# di-load ulang penuh jika versi tabel harga_pangan berubah tanpa ada perubahan yang
+# terbaca, dan selalu setelah PRICE_SNAPSHOT_FULL_REFRESH_SECONDS untuk rekonsiliasi.
+class LatestPriceSnapshot:
+    def __init__(
+        self,
+        refresh_seconds: float = PRICE_SNAPSHOT_REFRESH_SECONDS,
+        full_refresh_seconds: float = PRICE_SNAPSHOT_FULL_REFRESH_SECONDS,
+        overlap_seconds: float = PRICE_SNAPSHOT_OVERLAP_SECONDS
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.version = 0
+
+        self._by_pangan: Dict[int, LatestPrice] = {}
+        self._sorted: List[LatestPrice] = []
+        self._last_id = 0
+        self._last_updated_at: Optional[datetime] = None
+        # dimatikan otomatis jika harga_pangan tidak punya kolom updated_at
+        self._use_updated_at = True
+        self._index_checked = not PRICE_UPDATED_AT_INDEX_AUTO
+        self._table_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_newer(candidate: LatestPrice, current: Optional[LatestPrice]) -> bool:
+        if current is None:
+            return True
+        if candidate.id_harga == current.id_harga:
+            # baris yang sama di-UPDATE
+            return candidate != current
+        return (candidate.tanggal, candidate.id_harga) > (current.tanggal, current.id_harga)
+
+    def _publish(self) -> None:
+        self._sorted = sorted(self._by_pangan.values(), key=lambda p: p.nama)
+        self.version += 1
+
+    def _advance(self, last_id: int, updated_at: Optional[datetime]) -> None:
+        self._last_id = max(self._last_id, int(last_id or 0))
+        if updated_at is not None and (self._last_updated_at is None or updated_at > self._last_updated_at):
+            self._last_updated_at = updated_at
+
+    def _ensure_updated_at_index(self, engine: Engine) -> None:
+        self._index_checked = True
+        try:
+            with engine.connect() as conn:
+                if conn.execute(text(UPDATED_AT_INDEX_EXISTS_SQL)).scalar():
+                    return
+                conn.execute(text(CREATE_UPDATED_AT_INDEX_SQL))
+                conn.commit()
+            print(f"✅ Index {PRICE_UPDATED_AT_INDEX} dibuat untuk refresh harga incremental")
+        except Exception as e:
+            print(f"⚠️ Index updated_at harga_pangan tidak bisa dipastikan, refresh incremental bisa full scan: {e}")
+
+    def _full_load(self, engine: Engine) -> None:
+        if self._use_updated_at and not self._index_checked:
+            self._ensure_updated_at_index(engine)
+
+        with engine.connect() as conn:
+            try:
+                watermark = conn.execute(text(WATERMARK_SQL if self._use_updated_at else MAX_PRICE_ID_SQL)).one()
+            except Exception as e:
+                print(f"⚠️ harga_pangan tanpa updated_at, hanya memakai watermark id_harga: {e}")
+                conn.rollback()
+                self._use_updated_at = False
+                watermark = conn.execute(text(MAX_PRICE_ID_SQL)).one()
+            rows = conn.execute(text(LATEST_PRICE_SQL)).all()
+
+        self._by_pangan = {row.id_pangan: LatestPrice(*row) for row in rows}
+        self._last_id = 0
+        self._last_updated_at = None
+        self._advance(*watermark)
+        self._loaded_at = time.monotonic()
+        self._publish()
+        print(f"✅ Snapshot harga dimuat: {len(self._by_pangan)} pangan (versi {self.version})")
+
+    def _incremental(self, engine: Engine) -> bool:
+        if self._use_updated_at:
+            since = self._last_updated_at - self.overlap if self._last_updated_at is not None else None
+            statement, params = CHANGED_PRICES_SQL, {"last_id": self._last_id, "since": since}
+        else:
+            statement, params = NEW_PRICES_SQL, {"last_id": self._last_id}
+
+        with engine.connect() as conn:
+            rows = conn.execute(text(statement), params).all()
+
+        changed = False
+        for row in rows:
+            price = LatestPrice(*row[:5])
+            self._advance(price.id_harga, row[5])
+            if self._is_newer(price, self._by_pangan.get(price.id_pangan)):
+                self._by_pangan[price.id_pangan] = price
+                changed = True
+
+        if changed:
+            self._publish()
+        return changed
+
+    def refresh(self, engine: Engine, force: bool = False) -> "LatestPriceSnapshot":
+        table_versions = get_table_versions()
+        table_versions.start_refresher(engine)
+
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._loaded_at and now - self._checked_at < self.refresh_seconds:
+                return self
+            self._checked_at = now
+
+            table_version = table_versions.version("harga_pangan")
+            needs_full = (
+                force
+                or not self._loaded_at
+                or now - self._loaded_at > self.full_refresh_seconds
+            )
+
+            if needs_full:
+                self._full_load(engine)
+            elif not self._incremental(engine) and table_version != self._table_version:
+                self._full_load(engine)
+
+            self._table_version = table_version
+        return self
+
+    def items(self) -> List[LatestPrice]:
+        return self._sorted
+
+    def get(self, id_pangan: int) -> Optional[LatestPrice]:
+        return self._by_pangan.get(id_pangan)
+
+
+_LATEST_PRICES = LatestPriceSnapshot()
+
+
+def get_latest_prices() -> LatestPriceSnapshot:
+    return _LATEST_PRICES
@@ -1,10 +1,12 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, List, Dict
 from datetime import datetime
 from sqlmodel import SQLModel, Field, select, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import Column, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.types import JSON
+from app.db.table_versions import get_table_versions
 
 class FoodRecipe(SQLModel, table=True):
     __tablename__ = "resep_makanan"
@@ -23,6 +25,38 @@ def get_resep_by_nama(nama_olahan: str, session: Session) -> Optional[FoodRecipe
     return session.exec(statement).first()
 
 
+def _map_resep_by_requested_name(names: List[str], rows: List[FoodRecipe]) -> Dict[str, FoodRecipe]:
+    # collation MySQL case-insensitive, jadi kunci hasil mengikuti nama yang diminta
+    found: Dict[str, FoodRecipe] = {}
+    for resep in rows:
+        found.setdefault(resep.nama_olahan.casefold(), resep)
+
+    return {name: found[name.casefold()] for name in names if name.casefold() in found}
+
+
+def get_resep_by_nama_bulk(nama_olahan_list: List[str], session: Session) -> Dict[str, FoodRecipe]:
+    names = list(dict.fromkeys(nama_olahan_list))
+    if not names:
+        return {}
+
+    statement = select(FoodRecipe).where(FoodRecipe.nama_olahan.in_(names))
+    return _map_resep_by_requested_name(names, session.exec(statement).all())
+
+
+async def get_resep_by_nama_async(nama_olahan: str, session: AsyncSession) -> Optional[FoodRecipe]:
+    statement = select(FoodRecipe).where(FoodRecipe.nama_olahan == nama_olahan)
+    return (await session.exec(statement)).first()
+
+
+async def get_resep_by_nama_bulk_async(nama_olahan_list: List[str], session: AsyncSession) -> Dict[str, FoodRecipe]:
+    names = list(dict.fromkeys(nama_olahan_list))
+    if not names:
+        return {}
+
+    statement = select(FoodRecipe).where(FoodRecipe.nama_olahan.in_(names))
+    return _map_resep_by_requested_name(names, (await session.exec(statement)).all())
+
+
 def get_resep_by_vec_id(vec_id: str, session: Session) -> Optional[FoodRecipe]:
     statement = select(FoodRecipe).where(FoodRecipe.id_resep_vektor_db == vec_id)
     return session.exec(statement).first()
@@ -31,4 +65,13 @@ def InsertFoodRecipe(foodRecipe: FoodRecipe, session: Session) -> FoodRecipe:
     session.add(foodRecipe)
     session.commit()
     session.refresh(foodRecipe)
+    get_table_versions().bump(FoodRecipe.__tablename__)
+    return foodRecipe
+
+
+async def InsertFoodRecipeAsync(foodRecipe: FoodRecipe, session: AsyncSession) -> FoodRecipe:
+    session.add(foodRecipe)
+    await session.commit()
+    await session.refresh(foodRecipe)
+    get_table_versions().bump(FoodRecipe.__tablename__)
     return foodRecipe
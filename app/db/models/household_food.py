@@ -1,10 +1,12 @@
-from typing import Optional
+from typing import Optional, List
 from datetime import date
 from decimal import Decimal
 from sqlmodel import SQLModel, Field, Session
-from sqlalchemy import Column
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Column, insert
 from sqlalchemy.types import Numeric, Date
 
+from app.db.table_versions import get_table_versions
 from .family import Family 
 
 class HouseholdFood(SQLModel, table=True):
@@ -22,4 +24,61 @@ def InsertHouseholdFood(houseHoldFood: HouseholdFood, session: Session) -> House
     session.add(houseHoldFood)
     session.commit()
     session.refresh(houseHoldFood)
-    return houseHoldFood
\ No newline at end of file
+    get_table_versions().bump(HouseholdFood.__tablename__)
+    return houseHoldFood
+
+
+def _bulk_rows(houseHoldFoods: List[HouseholdFood]) -> List[dict]:
+    return [
+        {
+            "id_pangan": item.id_pangan,
+            "id_keluarga": item.id_keluarga,
+            "urt": item.urt,
+            "tanggal": item.tanggal,
+        }
+        for item in houseHoldFoods
+    ]
+
+
+def InsertHouseholdFoodBulk(houseHoldFoods: List[HouseholdFood], session: Session) -> int:
+    if not houseHoldFoods:
+        return 0
+
+    rows = _bulk_rows(houseHoldFoods)
+
+    # satu transaksi, executemany lewat Core (tanpa refresh per baris)
+    try:
+        session.connection().execute(insert(HouseholdFood.__table__), rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    get_table_versions().bump(HouseholdFood.__tablename__)
+    return len(rows)
+
+
+async def InsertHouseholdFoodAsync(houseHoldFood: HouseholdFood, session: AsyncSession) -> HouseholdFood:
+    session.add(houseHoldFood)
+    await session.commit()
+    await session.refresh(houseHoldFood)
+    get_table_versions().bump(HouseholdFood.__tablename__)
+    return houseHoldFood
+
+
+async def InsertHouseholdFoodBulkAsync(houseHoldFoods: List[HouseholdFood], session: AsyncSession) -> int:
+    if not houseHoldFoods:
+        return 0
+
+    rows = _bulk_rows(houseHoldFoods)
+
+    try:
+        conn = await session.connection()
+        await conn.execute(insert(HouseholdFood.__table__), rows)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+    get_table_versions().bump(HouseholdFood.__tablename__)
+    return len(rows)
@@ -0,0 +1,94 @@
+import time
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+PoolMetricsHook = Callable[[Dict[str, Any]], None]
+
+
+# Statistik pool koneksi: waktu tunggu checkout, timeout, dan hook untuk exporter metrik
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+        self._hooks: List[PoolMetricsHook] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: PoolMetricsHook) -> None:
+        self._hooks.append(hook)
+
+    def record_checkout(self, pool: QueuePool, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        if self._hooks:
+            stats = self.snapshot(pool)
+            stats["last_wait"] = waited
+            for hook in self._hooks:
+                try:
+                    hook(stats)
+                except Exception as e:
+                    print(f"⚠️ Pool metrics hook gagal: {e}")
+
+    def snapshot(self, pool: Optional[QueuePool]) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "pool": self.name,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total": self.wait_total,
+                "wait_avg": self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_max": self.wait_max,
+            }
+
+        if pool is not None:
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+
+class _InstrumentedPoolMixin:
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_checkout(self, time.perf_counter() - start, timed_out=True)
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record_checkout(self, time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # dispose()/invalidate membuat pool baru, metrik tetap dibawa
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,106 @@
+import os
+import json
+import pickle
+import hashlib
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import MetaData, text
+from sqlalchemy.engine import Engine
+from langchain_community.utilities import SQLDatabase
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCHEMA_SNAPSHOT_PATH = os.getenv("SCHEMA_SNAPSHOT_PATH", "cache/schema_snapshot.pkl")
+
+# sidik jari skema: satu query murah ke information_schema
+FINGERPRINT_SQL = """
+SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+_LOADED: Dict[str, Tuple[str, SQLDatabase]] = {}
+_LOCK = threading.Lock()
+
+
+def schema_fingerprint(engine: Engine) -> str:
+    with engine.connect() as conn:
+        rows = conn.execute(text(FINGERPRINT_SQL)).all()
+    payload = json.dumps([[str(col) for col in row] for row in rows])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _engine_key(engine: Engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+def _read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"⚠️ Snapshot skema tidak bisa dibaca, introspeksi ulang: {e}")
+        return None
+
+
+def _write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _build_snapshot(engine: Engine, version: str) -> Dict[str, Any]:
+    print("⏳ [SCHEMA] Introspeksi skema database...")
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+
+    db = SQLDatabase(engine, metadata=metadata)
+    # table_info per tabel (DDL + contoh baris) dihitung sekali di sini
+    table_info = {name: db.get_table_info([name]) for name in db.get_usable_table_names()}
+
+    return {
+        "engine": _engine_key(engine),
+        "version": version,
+        "metadata": metadata,
+        "table_info": table_info,
+    }
+
+
+# SQLDatabase dari snapshot: metadata hasil reflect + table_info tersimpan, sehingga
+# tidak ada reflect ulang maupun query contoh baris di setiap panggilan chain SQL.
+# Snapshot dibangun ulang hanya jika sidik jari skema berubah.
+def load_sql_database(engine: Engine, path: str = SCHEMA_SNAPSHOT_PATH) -> SQLDatabase:
+    key = _engine_key(engine)
+    version = schema_fingerprint(engine)
+
+    with _LOCK:
+        loaded = _LOADED.get(key)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        snapshot = _read_snapshot(path)
+        if snapshot is None or snapshot.get("engine") != key or snapshot.get("version") != version:
+            snapshot = _build_snapshot(engine, version)
+            _write_snapshot(path, snapshot)
+        else:
+            print(f"✅ [SCHEMA] Snapshot skema dipakai (versi {version[:12]})")
+
+        db = SQLDatabase(
+            engine,
+            metadata=snapshot["metadata"],
+            custom_table_info=snapshot["table_info"],
+        )
+        _LOADED[key] = (version, db)
+        return db
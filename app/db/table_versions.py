@@ -0,0 +1,169 @@
+import os
+import time
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection, Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TABLE_VERSION_REFRESH_SECONDS = float(os.getenv("TABLE_VERSION_REFRESH_SECONDS", "30"))
+# "auto": COUNT(*) + MAX(updated_at) untuk tabel yang punya kolom itu; tabel tanpa kolom
+# itu hanya mengandalkan bump lokal + TTL cache. "update_time": UPDATE_TIME dari
+# information_schema.TABLES, hanya benar jika server MySQL memakai
+# information_schema_stats_expiry=0 (default 86400 detik membuat nilainya di-cache
+# sampai sehari) dan tetap hilang setiap server restart.
+TABLE_VERSION_SOURCE = os.getenv("TABLE_VERSION_SOURCE", "auto").strip().lower()
+TABLE_VERSION_COLUMN = os.getenv("TABLE_VERSION_COLUMN", "updated_at")
+
+# information_schema.COLUMNS dibaca dari data dictionary, tidak kena stats expiry
+VERSION_COLUMNS_SQL = text("""
+SELECT c.TABLE_NAME
+FROM information_schema.COLUMNS c
+JOIN information_schema.TABLES t
+  ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+WHERE c.TABLE_SCHEMA = DATABASE() AND t.TABLE_TYPE = 'BASE TABLE'
+  AND c.COLUMN_NAME = :column AND c.TABLE_NAME IN :tables
+""").bindparams(bindparam("tables", expanding=True))
+
+UPDATE_TIME_SQL = text("""
+SELECT TABLE_NAME, UPDATE_TIME
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+""").bindparams(bindparam("tables", expanding=True))
+
+TableSnapshot = Tuple[Tuple[str, int], ...]
+
+
+def _quote(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _literal(name: str) -> str:
+    return "'" + name.replace("'", "''") + "'"
+
+
+def _read_stamps(conn: Connection, source: str, column: str, tables: Iterable[str]) -> Dict[str, str]:
+    tables = sorted(tables)
+    if not tables:
+        return {}
+
+    if source == "update_time":
+        rows = conn.execute(UPDATE_TIME_SQL, {"tables": tables}).all()
+        return {str(name): str(stamp) for name, stamp in rows}
+
+    with_column = [str(name) for name, in conn.execute(VERSION_COLUMNS_SQL, {"column": column, "tables": tables}).all()]
+    if not with_column:
+        return {}
+
+    # COUNT(*) menangkap DELETE, MAX(updated_at) menangkap INSERT/UPDATE
+    union = " UNION ALL ".join(
+        f"SELECT {_literal(name)}, COUNT(*), MAX({_quote(column)}) FROM {_quote(name)}"
+        for name in with_column
+    )
+    return {str(name): f"{count}|{latest}" for name, count, latest in conn.execute(text(union)).all()}
+
+
+# Nomor versi per tabel. Naik saat helper Insert* di proses ini menulis, atau saat
+# stempel tabel di DB berubah (lihat TABLE_VERSION_SOURCE), termasuk tulisan dari
+# aplikasi lain (admin SICUPANG). Stempel hanya dibaca untuk tabel yang pernah dibaca
+# cache lewat snapshot()/version(), oleh thread latar (start_refresher) tiap
+# TABLE_VERSION_REFRESH_SECONDS, jadi tidak pernah di jalur request.
+# Cache menyimpan snapshot versi tabel yang dibacanya dan dianggap basi begitu salah
+# satu versi itu berubah.
+class TableVersions:
+    def __init__(
+        self,
+        refresh_seconds: float = TABLE_VERSION_REFRESH_SECONDS,
+        source: str = TABLE_VERSION_SOURCE,
+        column: str = TABLE_VERSION_COLUMN
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.source = source
+        self.column = column
+
+        self._versions: Dict[str, int] = {}
+        self._stamps: Dict[str, str] = {}
+        self._tracked: Set[str] = set()
+        self._unstamped: Set[str] = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def track(self, *tables: str) -> None:
+        with self._lock:
+            self._tracked.update(table.lower() for table in tables)
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                key = table.lower()
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def version(self, table: str) -> int:
+        self.track(table)
+        return self._versions.get(table.lower(), 0)
+
+    def snapshot(self, tables: Iterable[str]) -> TableSnapshot:
+        tables = set(tables)
+        self.track(*tables)
+        with self._lock:
+            return tuple(sorted((t.lower(), self._versions.get(t.lower(), 0)) for t in tables))
+
+    def is_current(self, snapshot: TableSnapshot) -> bool:
+        return all(self.version(table) == version for table, version in snapshot)
+
+    def refresh_from_db(self, engine: Engine, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._refreshed_at < self.refresh_seconds:
+                return
+            self._refreshed_at = now
+            tracked = set(self._tracked)
+        try:
+            with engine.connect() as conn:
+                stamps = _read_stamps(conn, self.source, self.column, tracked)
+        except Exception as e:
+            # bukan MySQL / tidak ada akses information_schema: cukup bump lokal + TTL
+            print(f"⚠️ Gagal membaca versi tabel: {e}")
+            return
+
+        with self._lock:
+            for name, stamp in stamps.items():
+                key = name.lower()
+                if key in self._stamps and self._stamps[key] != stamp:
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                self._stamps[key] = stamp
+
+            unstamped = tracked - {name.lower() for name in stamps} - self._unstamped
+            self._unstamped |= unstamped
+        if unstamped:
+            print(f"⚠️ Tanpa kolom {self.column}, hanya bump lokal + TTL: {', '.join(sorted(unstamped))}")
+
+    def start_refresher(self, engine: Engine) -> None:
+        # idempoten: dipanggil dari jalur request, hanya thread pertama yang dibuat
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._refresh_loop, args=(engine,), daemon=True)
+            self._worker.start()
+
+    def stop_refresher(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self, engine: Engine) -> None:
+        while True:
+            self.refresh_from_db(engine, force=True)
+            if self._stop.wait(self.refresh_seconds):
+                return
+
+
+_TABLE_VERSIONS = TableVersions()
+
+
+def get_table_versions() -> TableVersions:
+    return _TABLE_VERSIONS
@@ -0,0 +1,52 @@
+import re
+from typing import List, Iterable
+
+
+# Input "tidak ada" / "-" / kosong berarti tanpa alergi
+NO_ALLERGY = {
+    "", "-", "tidak", "tidak ada", "tidak punya", "none", "no", "nothing", "kosong", "nihil",
+    "tidak ada alergi", "tidak alergi", "tidak punya alergi", "tanpa alergi", "bebas alergi",
+}
+
+# Istilah umum alergi -> kata kunci nama pangan yang harus dikeluarkan
+ALLERGEN_SYNONYMS = {
+    "seafood": ["udang", "kepiting", "rajungan", "cumi", "sotong", "kerang", "lobster", "tiram", "teripang"],
+    "makanan laut": ["udang", "kepiting", "rajungan", "cumi", "sotong", "kerang", "lobster", "tiram", "teripang"],
+    "udang": ["udang", "ebi", "rebon", "terasi"],
+    "ikan": ["ikan", "teri", "bandeng", "tongkol", "lele", "nila", "gurame", "mujair", "tuna", "sarden", "pindang"],
+    "kacang": ["kacang"],
+    "kacang tanah": ["kacang tanah", "selai kacang"],
+    "kedelai": ["kedelai", "tahu", "tempe", "kecap", "susu kedelai", "tauco", "oncom"],
+    "susu": ["susu", "keju", "yoghurt", "yogurt", "mentega", "krim"],
+    "laktosa": ["susu", "keju", "yoghurt", "yogurt", "krim"],
+    "telur": ["telur"],
+    "gluten": ["terigu", "gandum", "roti", "mi", "mie", "pasta", "biskuit"],
+    "gandum": ["terigu", "gandum", "roti", "mie", "pasta", "biskuit"],
+}
+
+
+def parse_alergi(alergi: str) -> List[str]:
+    text = re.sub(r"\s+", " ", str(alergi or "")).strip().casefold()
+    if text in NO_ALLERGY:
+        return []
+
+    parts = re.split(r"[,;/\n]|\bdan\b|\&", text)
+    terms = []
+    for part in parts:
+        part = re.sub(r"^alergi(\s+terhadap)?[\s:]+", "", part.strip())
+        if not part or part in NO_ALLERGY:
+            continue
+        for term in ALLERGEN_SYNONYMS.get(part, [part]):
+            if term not in terms:
+                terms.append(term)
+    return terms
+
+
+def normalize_alergi(alergi: str) -> str:
+    # bentuk kanonik untuk kunci cache: urutan & penulisan tidak berpengaruh
+    return ",".join(sorted(parse_alergi(alergi)))
+
+
+def contains_allergen(nama_pangan: str, terms: Iterable[str]) -> bool:
+    name = str(nama_pangan).casefold()
+    return any(re.search(rf"\b{re.escape(term)}\b", name) for term in terms)
@@ -49,4 +49,12 @@ def sanitize_sql(sql: str, limit_default: int = 200) -> str:
         sql = sql.rstrip(";") + f" LIMIT {limit_default};"
     else:
         sql = sql.rstrip(";") + ";"
-    return sql
\ No newline at end of file
+    return sql
+
+def referenced_tables(sql: str, known_tables) -> list:
+    # nama tabel yang muncul sebagai kata utuh di query (boleh dengan backtick / prefix skema)
+    low = sql.lower()
+    return sorted(
+        t for t in known_tables
+        if re.search(rf"(?<![\w$]){re.escape(t.lower())}(?![\w$])", low)
+    )
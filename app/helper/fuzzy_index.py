@@ -0,0 +1,87 @@
+import math
+from collections import Counter, defaultdict
+from typing import List, Dict, Tuple, Iterable, Set
+
+from fuzzywuzzy import utils
+
+
+# Index bigram karakter untuk mempersempit kandidat sebelum fuzz.token_set_ratio.
+#
+# Filter ini aman (tidak pernah membuang nama yang bisa mencapai min_score):
+# - jika dua nama berbagi token utuh, keduanya pasti lolos lewat index token;
+# - jika tidak berbagi token, token_set_ratio = ratio(token terurut A, token terurut B).
+#   Skor >= min_score butuh LCS M >= r * T / 2 (T = total panjang, r = min_score - 0.5).
+#   LCS terbagi dalam R blok bersambung dengan R - 1 <= T - 2M, sehingga jumlah bigram
+#   bersama (multiset) minimal M - R >= 3M - T - 1, dan minimal 1 bila token diberi
+#   padding spasi (kasus M = 2, T = 5).
+class BigramIndex:
+    def __init__(self, names: Iterable[str], min_score: int = 80):
+        self.names: List[str] = list(names)
+        self.min_ratio = (min_score - 0.5) / 100
+
+        self._token_postings: Dict[str, List[int]] = defaultdict(list)
+        self._bigram_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+
+        for idx, name in enumerate(self.names):
+            tokens = self._choice_tokens(name)
+            self._lengths.append(self._joined_length(tokens))
+
+            for token in tokens:
+                self._token_postings[token].append(idx)
+            for bigram, count in self._bigrams(tokens).items():
+                self._bigram_postings[bigram].append((idx, count))
+
+    # Meniru pra-proses process.extractOne(scorer=token_set_ratio): query diproses
+    # full_process lalu full_process(force_ascii=True), pilihan hanya yang kedua.
+    @staticmethod
+    def _choice_tokens(text: str) -> Set[str]:
+        return set(utils.full_process(text, force_ascii=True).split())
+
+    @staticmethod
+    def _query_tokens(text: str) -> Set[str]:
+        return set(utils.full_process(utils.full_process(text), force_ascii=True).split())
+
+    @staticmethod
+    def _joined_length(tokens: Set[str]) -> int:
+        if not tokens:
+            return 0
+        return sum(len(t) for t in tokens) + len(tokens) - 1
+
+    @staticmethod
+    def _bigrams(tokens: Set[str]) -> Counter:
+        counts: Counter = Counter()
+        for token in tokens:
+            padded = f" {token} "
+            for i in range(len(padded) - 1):
+                counts[padded[i:i + 2]] += 1
+        return counts
+
+    def _min_shared_bigrams(self, total_length: int) -> int:
+        min_lcs = math.ceil(self.min_ratio * total_length / 2)
+        return max(1, 3 * min_lcs - total_length - 1)
+
+    def candidates(self, query: str) -> List[str]:
+        tokens = self._query_tokens(query)
+        if not tokens:
+            return []
+
+        query_length = self._joined_length(tokens)
+        selected: Set[int] = set()
+
+        for token in tokens:
+            selected.update(self._token_postings.get(token, ()))
+
+        shared: Dict[int, int] = defaultdict(int)
+        for bigram, query_count in self._bigrams(tokens).items():
+            for idx, count in self._bigram_postings.get(bigram, ()):
+                shared[idx] += min(query_count, count)
+
+        for idx, overlap in shared.items():
+            if idx in selected:
+                continue
+            if overlap >= self._min_shared_bigrams(query_length + self._lengths[idx]):
+                selected.add(idx)
+
+        # urutan asli dipertahankan supaya tie-break extractOne tetap sama
+        return [self.names[idx] for idx in sorted(selected)]
@@ -0,0 +1,47 @@
+import re
+from fractions import Fraction
+from typing import Optional, Tuple
+
+
+# Satuan massa -> gram
+MASS_UNITS = {
+    "g": 1.0, "gr": 1.0, "gram": 1.0,
+    "ons": 100.0,
+    "kg": 1000.0, "kilo": 1000.0, "kilogram": 1000.0,
+    "kuintal": 100000.0,
+}
+
+_QUANTITY_UNIT_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?)?\s*([a-z]+)")
+
+
+def split_takaran(takaran: str) -> Tuple[float, Optional[str]]:
+    # "1/2 kg" -> (0.5, "kg"), "Butir" -> (1.0, "butir")
+    match = _QUANTITY_UNIT_RE.match(str(takaran or "").casefold())
+    if match is None:
+        return 1.0, None
+
+    quantity_text, unit = match.groups()
+    quantity = 1.0
+    if quantity_text:
+        try:
+            quantity = float(Fraction(quantity_text.replace(",", ".").replace(" ", "")))
+        except (ValueError, ZeroDivisionError):
+            return 1.0, None
+    return quantity, unit
+
+
+def unit_grams(takaran: str, referensi_urt: str = "", referensi_gram_berat: float = 0) -> Optional[float]:
+    # berat (gram) satu takaran harga. Satuan massa dikonversi langsung; satuan hitungan
+    # (butir, buah, ikat, ...) hanya jika referensi_urt pangan memakai satuan yang sama.
+    # Satuan volume atau yang tidak dikenal -> None.
+    quantity, unit = split_takaran(takaran)
+    if unit is None or quantity <= 0:
+        return None
+
+    if unit in MASS_UNITS:
+        return quantity * MASS_UNITS[unit]
+
+    ref_quantity, ref_unit = split_takaran(referensi_urt)
+    if ref_unit == unit and ref_quantity > 0 and float(referensi_gram_berat or 0) > 0:
+        return quantity * float(referensi_gram_berat) / ref_quantity
+    return None
@@ -1,15 +1,45 @@
-from fastapi import APIRouter
+import json
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from app.services.feature.chatbot import Chatbot
+from app.services.container import get_chatbot
 from pydantic import BaseModel
 
 router = APIRouter()
-chatbot = Chatbot()
 
 class ChatbotInput(BaseModel):
     prompt: str
     
 @router.post("/sicupang-ai")
-def get_recommendation(input: ChatbotInput):
-    result = chatbot.ask(input.prompt)
+async def get_recommendation(input: ChatbotInput, chatbot: Chatbot = Depends(get_chatbot)):
+    result = await chatbot.aask(input.prompt)
     return {"response": result}
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/sicupang-ai/stream")
+async def stream_recommendation(input: ChatbotInput, chatbot: Chatbot = Depends(get_chatbot)):
+    async def events():
+        try:
+            async for event, data in chatbot.astream_answer(input.prompt):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/sicupang-ai/router-metrics")
+def get_router_metrics(chatbot: Chatbot = Depends(get_chatbot)):
+    return chatbot.router.metrics()
+
+@router.get("/sicupang-ai/cache-stats")
+def get_cache_stats(chatbot: Chatbot = Depends(get_chatbot)):
+    return {
+        "answer": chatbot.answer_cache.stats() if chatbot.answer_cache is not None else {"enabled": False},
+        "sql": chatbot.sql_cache.stats() if chatbot.sql_cache is not None else {"enabled": False},
+    }
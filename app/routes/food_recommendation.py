@@ -1,19 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.services.feature.ingredient_recommend import IngredientRecommend
+from app.services.container import get_ingredient_recommend
 from pydantic import BaseModel
 
 router = APIRouter()
 
-ingredientRecommend = IngredientRecommend()
-
 class IngredientInput(BaseModel):
     jumlah_keluarga: int
     budget: int
     alergi: str
+    fast: bool = False
     
 @router.post("/ingredient-recommend")
-def get_recommendation(input: IngredientInput):
-    result = ingredientRecommend.get_recommendation(input.jumlah_keluarga, input.budget, input.alergi)
+def get_recommendation(input: IngredientInput, ingredientRecommend: IngredientRecommend = Depends(get_ingredient_recommend)):
+    result = ingredientRecommend.get_recommendation(input.jumlah_keluarga, input.budget, input.alergi, fast=input.fast)
     return {"response": result}
 
+
+@router.get("/ingredient-recommend/cache-stats")
+def get_cache_stats(ingredientRecommend: IngredientRecommend = Depends(get_ingredient_recommend)):
+    return {"price_version": ingredientRecommend.prices.version, **ingredientRecommend.cache.stats()}
@@ -0,0 +1,218 @@
+import os
+import re
+import asyncio
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+load_dotenv()
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "4096"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+_EMBEDDING_CACHE: Optional["EmbeddingCache"] = None
+_EMBEDDING_CACHE_LOCK = threading.Lock()
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+# LRU di memori di depan penyimpanan SQLite, key = (nama model, teks ternormalisasi)
+class EmbeddingCache:
+    def __init__(
+        self,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+        memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, text))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        disk_lookup: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (model, normalize_text(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookup.setdefault(key[1], []).append(i)
+
+            if disk_lookup and self._conn is not None:
+                now = time.time()
+                found = []
+                keys = list(disk_lookup.keys())
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._conn.execute(
+                        f"SELECT text, vector FROM embeddings WHERE model = ? AND text IN ({placeholders})",
+                        [model, *chunk]
+                    ).fetchall()
+                    for norm_text, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        self._remember((model, norm_text), vector)
+                        for i in disk_lookup.pop(norm_text):
+                            results[i] = vector
+                            self.disk_hits += 1
+                        found.append((now, model, norm_text))
+
+                if found:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?", found
+                    )
+                    self._conn.commit()
+
+            self.misses += sum(len(idx) for idx in disk_lookup.values())
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                norm_text = normalize_text(text)
+                self._remember((model, norm_text), list(vector))
+                rows.append((model, norm_text, np.asarray(vector, dtype=np.float32).tobytes(), now))
+
+            if rows and self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text, vector, last_used) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if total <= self.max_entries:
+            return
+
+        # buang 10% entri paling lama tidak dipakai supaya tidak evict tiap insert
+        to_delete = total - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            " SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (to_delete,)
+        )
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+# Pembungkus Embeddings LangChain: hanya teks yang belum ada di cache yang dikirim ke model
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+
+    def _split_misses(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[str]]:
+        cached = self.cache.get_many(self.model_name, texts)
+
+        missing: Dict[str, str] = {}
+        for text, vector in zip(texts, cached):
+            if vector is None:
+                missing.setdefault(normalize_text(text), text)
+        return cached, list(missing.values())
+
+    def _merge(self, texts: List[str], cached: List[Optional[List[float]]], missing: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        if missing:
+            self.cache.put_many(self.model_name, missing, vectors)
+
+        fresh = {normalize_text(text): vector for text, vector in zip(missing, vectors)}
+        return [vec if vec is not None else fresh[normalize_text(text)] for text, vec in zip(texts, cached)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split_misses(texts)
+        vectors = self.embeddings.embed_documents(missing) if missing else []
+        return self._merge(texts, cached, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # baca/tulis SQLite (termasuk UPDATE last_used + commit) di thread, bukan di event loop
+        cached, missing = await asyncio.to_thread(self._split_misses, texts)
+        vectors = await self.embeddings.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(self._merge, texts, cached, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _EMBEDDING_CACHE
+
+    if _EMBEDDING_CACHE is not None:
+        return _EMBEDDING_CACHE
+
+    with _EMBEDDING_CACHE_LOCK:
+        if _EMBEDDING_CACHE is None:
+            _EMBEDDING_CACHE = EmbeddingCache()
+    return _EMBEDDING_CACHE
+
+
+def get_cached_embeddings(model: str = "text-embedding-3-small") -> CachedEmbeddings:
+    return CachedEmbeddings(OpenAIEmbeddings(model=model), model_name=model)
@@ -0,0 +1,85 @@
+import os
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.helper.allergen import normalize_alergi
+
+load_dotenv()
+
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "256"))
+# lebar bucket budget relatif; hasil cache bisa menyisakan paling banyak ~sekian
+# bagian budget tidak terpakai dibanding menghitung ulang untuk budget persis
+RECOMMENDATION_BUDGET_TOLERANCE = float(os.getenv("RECOMMENDATION_BUDGET_TOLERANCE", "0.02"))
+
+RecommendationKey = Tuple[int, int, str, int, str]
+
+
+# Cache hasil rekomendasi per (jumlah_keluarga, budget bucket, alergi ternormalisasi,
+# versi snapshot harga, mode). Bucket budget relatif (lebar RECOMMENDATION_BUDGET_TOLERANCE,
+# skala log), rencana selalu dihitung untuk budget asli; saat hit, hasil hanya dipakai
+# jika totalnya tidak melebihi budget request, jadi sisa budget tak terpakai akibat
+# cache paling banyak ~tolerance. Versi harga ada di kunci, jadi perubahan harga
+# otomatis membuat entri lama tidak terpakai; entri versi lama dibuang saat put. LRU.
+class RecommendationCache:
+    def __init__(
+        self,
+        max_entries: int = RECOMMENDATION_CACHE_MAX_ENTRIES,
+        budget_tolerance: float = RECOMMENDATION_BUDGET_TOLERANCE
+    ):
+        self.max_entries = max_entries
+        self.budget_tolerance = budget_tolerance
+
+        self._entries: "OrderedDict[RecommendationKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, budget: int) -> int:
+        # indeks bucket log: budget dalam rentang [(1+t)^k, (1+t)^(k+1)) berbagi bucket k
+        if self.budget_tolerance <= 0 or budget <= 0:
+            return int(budget)
+        return math.floor(math.log(budget) / math.log1p(self.budget_tolerance))
+
+    def key(self, jumlah_keluarga: int, budget: int, alergi: str, price_version: int, mode: str) -> RecommendationKey:
+        return (int(jumlah_keluarga), self.bucket(budget), normalize_alergi(alergi), int(price_version), mode)
+
+    @staticmethod
+    def _fits(result: Dict[str, Any], budget: int) -> bool:
+        total = result.get("total_perkiraan_pengeluaran") if isinstance(result, dict) else None
+        try:
+            return float(total) <= budget
+        except (TypeError, ValueError):
+            return False
+
+    def get(self, key: RecommendationKey, budget: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None or not self._fits(result, budget):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: RecommendationKey, result: Dict[str, Any]) -> None:
+        if self.max_entries <= 0 or result is None:
+            return
+
+        price_version = key[3]
+        with self._lock:
+            for old_key in [k for k in self._entries if k[3] != price_version]:
+                del self._entries[old_key]
+
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.db.table_versions import TableVersions, TableSnapshot, get_table_versions
+
+load_dotenv()
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+
+def _numbers(text: str) -> frozenset:
+    return frozenset(re.findall(r"\d+(?:[.,]\d+)?", text))
+
+
+class CachedAnswer(NamedTuple):
+    question: str
+    answer: Any
+    tables: TableSnapshot
+    numbers: frozenset
+    created_at: float
+
+
+# Cache jawaban berdasarkan kemiripan embedding pertanyaan (cosine >= threshold).
+# Entri basi jika melewati TTL atau versi salah satu tabel yang dibaca jawabannya berubah.
+# Pertanyaan dengan angka berbeda (tahun, bulan, jumlah) tidak pernah dianggap sama.
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        table_versions: Optional[TableVersions] = None
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.table_versions = table_versions or get_table_versions()
+
+        # slot tetap di matriks vektor, LRU lewat OrderedDict slot -> entri
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            return None
+        return vec / norm
+
+    def _is_fresh(self, entry: CachedAnswer, now: float) -> bool:
+        if self.ttl > 0 and now - entry.created_at > self.ttl:
+            return False
+        return self.table_versions.is_current(entry.tables)
+
+    def _drop(self, slot: int) -> None:
+        self._entries.pop(slot, None)
+        self._free_slots.append(slot)
+
+    def get(self, question: str, vector: Sequence[float]) -> Optional[Any]:
+        query_vec = self._normalize(vector)
+        if query_vec is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            scores = self._vectors[slots] @ query_vec
+            numbers = _numbers(question)
+
+            for idx in np.argsort(-scores):
+                if scores[idx] < self.threshold:
+                    break
+                slot = int(slots[idx])
+                entry = self._entries[slot]
+                if not self._is_fresh(entry, now):
+                    self._drop(slot)
+                    self.stale += 1
+                    continue
+                if entry.numbers != numbers:
+                    continue
+
+                self._entries.move_to_end(slot)
+                self.hits += 1
+                return entry.answer
+
+            self.misses += 1
+            return None
+
+    def put(self, question: str, vector: Sequence[float], answer: Any, tables: Sequence[str] = ()) -> None:
+        vec = self._normalize(vector)
+        if vec is None or self.max_entries <= 0:
+            return
+
+        entry = CachedAnswer(
+            question=question,
+            answer=answer,
+            tables=self.table_versions.snapshot(tables),
+            numbers=_numbers(question),
+            created_at=time.time(),
+        )
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            elif len(self._entries) < self.max_entries:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._entries.popitem(last=False)
+
+            self._vectors[slot] = vec
+            self._entries[slot] = entry
+            self._entries.move_to_end(slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._free_slots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
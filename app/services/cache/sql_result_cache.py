@@ -0,0 +1,125 @@
+import os
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence, NamedTuple
+
+from dotenv import load_dotenv
+
+from app.db.table_versions import TableVersions, TableSnapshot, get_table_versions
+
+load_dotenv()
+
+SQL_CACHE_TTL = float(os.getenv("SQL_CACHE_TTL", "300"))
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "512"))
+SQL_CACHE_MAX_BYTES = int(os.getenv("SQL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_LITERAL_RE = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\")")
+
+
+def canonicalize_sql(sql: str) -> str:
+    # huruf kecil + spasi tunggal di luar literal string, tanpa backtick / titik koma akhir
+    parts = _LITERAL_RE.split(sql.strip().rstrip(";").strip())
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            out.append(part)
+            continue
+        part = re.sub(r"\s+", " ", part.replace("`", "")).lower()
+        part = re.sub(r"\s*([(),=<>])\s*", r"\1", part)
+        out.append(part)
+    return "".join(out).strip()
+
+
+class CachedResult(NamedTuple):
+    result: Any
+    tables: TableSnapshot
+    size: int
+    created_at: float
+
+
+# Hasil query SQL per SQL kanonik. Entri menyimpan snapshot versi tabel yang dibaca,
+# jadi tulisan ke satu tabel hanya membuang hasil query yang membaca tabel itu.
+# Dibatasi TTL, jumlah entri, dan perkiraan total byte hasil (LRU).
+class SqlResultCache:
+    def __init__(
+        self,
+        ttl: float = SQL_CACHE_TTL,
+        max_entries: int = SQL_CACHE_MAX_ENTRIES,
+        max_bytes: int = SQL_CACHE_MAX_BYTES,
+        table_versions: Optional[TableVersions] = None
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.table_versions = table_versions or get_table_versions()
+
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def get(self, sql: str) -> Optional[Any]:
+        key = canonicalize_sql(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expired = self.ttl > 0 and time.time() - entry.created_at > self.ttl
+            if expired or not self.table_versions.is_current(entry.tables):
+                self._pop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.result
+
+    def put(self, sql: str, result: Any, tables: Sequence[str]) -> None:
+        size = len(result) if isinstance(result, (str, bytes)) else sys.getsizeof(result)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+
+        key = canonicalize_sql(sql)
+        entry = CachedResult(
+            result=result,
+            tables=self.table_versions.snapshot(tables),
+            size=size,
+            created_at=time.time(),
+        )
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest, _ = next(iter(self._entries.items()))
+                self._pop(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
@@ -0,0 +1,98 @@
+import os
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlmodel import Session, select
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import DBService
+from app.db.table_versions import get_table_versions
+from app.db.models.food_ingredient import get_pangan_catalog
+from app.db.models.food_recipe import FoodRecipe, get_resep_by_nama_bulk
+from app.services.feature.chatbot import Chatbot
+from app.services.feature.ingredient_extract import IngredientExtract
+from app.services.feature.ingredient_recommend import IngredientRecommend
+
+SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "true").strip().lower() in ("1", "true", "yes")
+# jumlah resep terbaru yang dibaca saat warmup
+RECIPE_WARMUP_LIMIT = int(os.getenv("RECIPE_WARMUP_LIMIT", "200"))
+# dibaca dari env yang sama dengan DBService (load_dotenv sudah jalan saat app.db.database di-import)
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+
+
+# Semua service dibuat sekali per worker di lifespan FastAPI lalu di-inject lewat Depends
+class ServiceContainer:
+    def __init__(self, db: Optional[DBService] = None):
+        self.db = db or DBService()
+        self.ingredient_extract = IngredientExtract(db=self.db)
+        self.chatbot = Chatbot(db=self.db)
+        self.ingredient_recommend = IngredientRecommend(db=self.db)
+
+    def _warmup_sync(self) -> None:
+        # buka koneksi pool + muat katalog pangan
+        with Session(self.db.engine) as session:
+            session.execute(text("SELECT 1"))
+            catalog = get_pangan_catalog().ensure_loaded(session)
+            print(f"🔥 Warmup katalog pangan: versi {catalog.version}")
+
+            # cache resep (resep_makanan): jalankan lookup bulk yang sama dengan searchingFood
+            # untuk resep terbaru supaya statement ter-compile dan halaman tabel sudah di memori DB
+            names = session.exec(
+                select(FoodRecipe.nama_olahan).order_by(FoodRecipe.updated_at.desc()).limit(RECIPE_WARMUP_LIMIT)
+            ).all()
+            recipes = get_resep_by_nama_bulk(list(names), session)
+            print(f"🔥 Warmup cache resep: {len(recipes)} resep")
+
+        # index resep lokal (no-op untuk backend Pinecone)
+        warmup_index = getattr(self.ingredient_extract.recipe_index, "warmup", None)
+        if callable(warmup_index):
+            warmup_index()
+            print("🔥 Warmup index resep lokal selesai")
+
+        # snapshot harga terbaru untuk rekomendasi
+        prices = self.ingredient_recommend.prices.refresh(self.db.engine)
+        print(f"🔥 Warmup snapshot harga: versi {prices.version}")
+
+    async def warmup(self) -> None:
+        try:
+            await run_in_threadpool(self._warmup_sync)
+        except Exception as e:
+            # worker tetap jalan, cache akan terisi saat request pertama
+            print(f"⚠️ Warmup gagal: {e}")
+
+    async def aclose(self) -> None:
+        get_table_versions().stop_refresher()
+        self.db.engine.dispose()
+        if self.db.async_engine is not None:
+            await self.db.async_engine.dispose()
+
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+
+def get_ingredient_extract(services: ServiceContainer = Depends(get_services)) -> IngredientExtract:
+    return services.ingredient_extract
+
+
+def get_chatbot(services: ServiceContainer = Depends(get_services)) -> Chatbot:
+    return services.chatbot
+
+
+def get_ingredient_recommend(services: ServiceContainer = Depends(get_services)) -> IngredientRecommend:
+    return services.ingredient_recommend
+
+
+# generator sync dijalankan FastAPI di threadpool, termasuk saat menutup Session
+def get_sync_db_session(services: ServiceContainer = Depends(get_services)):
+    yield from services.db.get_session()
+
+
+async def get_async_db_session(services: ServiceContainer = Depends(get_services)):
+    async for session in services.db.get_async_session():
+        yield session
+
+
+# DB_ASYNC_ENABLED=true -> AsyncSession native, selain itu Session sync lewat threadpool
+get_db_session = get_async_db_session if DB_ASYNC_ENABLED else get_sync_db_session
@@ -0,0 +1,153 @@
+import os
+import math
+from typing import List, Dict, Any, Optional, NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# AKG rata-rata dewasa (Permenkes 28/2019), dipakai per anggota keluarga per hari
+KALORI_HARIAN = float(os.getenv("KALORI_HARIAN", "2100"))
+PROTEIN_HARIAN = float(os.getenv("PROTEIN_HARIAN", "57"))
+HARI_PER_BULAN = int(os.getenv("HARI_PER_BULAN", "30"))
+
+# kuantitas dipilih dalam kelipatan ini
+OPTIMIZER_STEP_GRAMS = float(os.getenv("OPTIMIZER_STEP_GRAMS", "250"))
+# batas variasi: satu bahan maksimal sekian bagian target kalori / gram per orang per hari
+OPTIMIZER_MAX_KALORI_SHARE = float(os.getenv("OPTIMIZER_MAX_KALORI_SHARE", "0.4"))
+OPTIMIZER_MAX_GRAM_HARIAN = float(os.getenv("OPTIMIZER_MAX_GRAM_HARIAN", "300"))
+# jumlah jenis bahan maksimal dalam satu keranjang
+OPTIMIZER_MAX_ITEMS = int(os.getenv("OPTIMIZER_MAX_ITEMS", "15"))
+
+
+class FoodCandidate(NamedTuple):
+    id_pangan: int
+    nama: str
+    harga: float
+    gram: float
+    kalori: float
+    protein: float
+    # nama takaran harga_satuan (kg, ikat, liter, ...) dan beratnya dalam gram
+    # (lihat helper.takaran); None jika takaran bukan satuan berat yang bisa dikonversi
+    takaran: str
+    unit_gram: Optional[float]
+
+
+# Optimizer keranjang belanja deterministik (greedy knapsack bervektor NumPy).
+# Setiap langkah menambah OPTIMIZER_STEP_GRAMS dari bahan dengan nilai gizi per rupiah
+# tertinggi: nilai = kontribusi ke sisa kekurangan kalori + protein (relatif terhadap
+# target), dibagi (1 + jumlah langkah bahan itu) supaya keranjang bervariasi,
+# dengan paling banyak OPTIMIZER_MAX_ITEMS jenis bahan.
+# Setelah target terpenuhi sisa budget tetap diisi sampai tidak ada langkah yang muat.
+class BudgetOptimizer:
+    def __init__(
+        self,
+        kalori_harian: float = KALORI_HARIAN,
+        protein_harian: float = PROTEIN_HARIAN,
+        hari: int = HARI_PER_BULAN,
+        step_grams: float = OPTIMIZER_STEP_GRAMS,
+        max_kalori_share: float = OPTIMIZER_MAX_KALORI_SHARE,
+        max_gram_harian: float = OPTIMIZER_MAX_GRAM_HARIAN,
+        max_items: int = OPTIMIZER_MAX_ITEMS
+    ):
+        self.kalori_harian = kalori_harian
+        self.protein_harian = protein_harian
+        self.hari = hari
+        self.step_grams = step_grams
+        self.max_kalori_share = max_kalori_share
+        self.max_gram_harian = max_gram_harian
+        self.max_items = max_items
+
+    def targets(self, jumlah_keluarga: int) -> Dict[str, float]:
+        orang_hari = max(int(jumlah_keluarga), 1) * self.hari
+        return {
+            "kalori": self.kalori_harian * orang_hari,
+            "protein": self.protein_harian * orang_hari,
+        }
+
+    def optimize(self, candidates: List[FoodCandidate], jumlah_keluarga: int, budget: float) -> Dict[str, Any]:
+        target = self.targets(jumlah_keluarga)
+        # hanya pangan dengan harga per gram yang bisa dihitung
+        usable = [c for c in candidates if c.harga > 0 and c.gram > 0 and c.unit_gram]
+
+        plan: Dict[str, Any] = {
+            "items": [],
+            "total": 0,
+            "kalori": 0.0,
+            "protein": 0.0,
+            "target_kalori": target["kalori"],
+            "target_protein": target["protein"],
+        }
+        if not usable or budget <= 0:
+            return plan
+
+        step = self.step_grams
+        cost = np.array([c.harga * step / c.unit_gram for c in usable])
+        kcal = np.array([c.kalori * step / c.gram for c in usable])
+        prot = np.array([c.protein * step / c.gram for c in usable])
+
+        orang_hari = max(int(jumlah_keluarga), 1) * self.hari
+        gram_cap = np.floor(self.max_gram_harian * orang_hari / step)
+        kcal_cap = np.floor(self.max_kalori_share * target["kalori"] / np.maximum(kcal, 1e-9))
+        cap = np.maximum(np.minimum(gram_cap, kcal_cap), 1)
+
+        steps = np.zeros(len(usable))
+        remaining = float(budget)
+        kcal_deficit = target["kalori"]
+        prot_deficit = target["protein"]
+
+        while True:
+            feasible = (cost <= remaining) & (steps < cap)
+            if np.count_nonzero(steps) >= self.max_items:
+                feasible &= steps > 0
+            if not feasible.any():
+                break
+
+            if kcal_deficit > 0 or prot_deficit > 0:
+                gain = (
+                    np.minimum(kcal, kcal_deficit) / target["kalori"]
+                    + np.minimum(prot, prot_deficit) / target["protein"]
+                )
+            else:
+                gain = kcal / target["kalori"] + prot / target["protein"]
+
+            score = np.where(feasible, gain / cost / (1.0 + steps), -np.inf)
+            best = int(np.argmax(score))
+            if not np.isfinite(score[best]) or score[best] <= 0:
+                break
+
+            steps[best] += 1
+            remaining -= cost[best]
+            kcal_deficit = max(kcal_deficit - kcal[best], 0.0)
+            prot_deficit = max(prot_deficit - prot[best], 0.0)
+
+        for i in np.flatnonzero(steps):
+            candidate = usable[i]
+            grams = float(steps[i] * step)
+            harga = int(steps[i] * cost[i])
+            plan["items"].append({
+                "id_pangan": candidate.id_pangan,
+                "nama": candidate.nama,
+                "gram": grams,
+                "harga": harga,
+                "kalori": float(steps[i] * kcal[i]),
+                "protein": float(steps[i] * prot[i]),
+            })
+
+        plan["items"].sort(key=lambda item: item["harga"], reverse=True)
+        plan["total"] = sum(item["harga"] for item in plan["items"])
+        plan["kalori"] = sum(item["kalori"] for item in plan["items"])
+        plan["protein"] = sum(item["protein"] for item in plan["items"])
+        return plan
+
+
+def format_jumlah(grams: float) -> str:
+    if grams >= 1000:
+        kg = grams / 1000
+        return f"{kg:g} kg" if kg == math.floor(kg) else f"{kg:.2f}".rstrip("0").rstrip(".") + " kg"
+    return f"{grams:g} gram"
+
+
+def default_manfaat(item: Dict[str, Any]) -> str:
+    return f"Menyumbang sekitar {item['kalori']:,.0f} kkal energi dan {item['protein']:,.0f} g protein per bulan."
@@ -4,16 +4,28 @@ from langchain_core.output_parsers import StrOutputParser
 from app.db.database import DBService
 from langchain_openai import ChatOpenAI
 from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
-from app.helper.clean_sql import extract_select, sanitize_sql
+from app.services.cache.embedding_cache import get_cached_embeddings
+from app.services.cache.semantic_cache import SemanticCache
+from app.services.cache.sql_result_cache import SqlResultCache
+from app.services.feature.query_router import QueryRouter, parse_llm_route
+from app.db.table_versions import get_table_versions
+from app.helper.clean_sql import extract_select, sanitize_sql, referenced_tables
 from langchain.prompts import PromptTemplate
+from langchain_community.utilities.sql_database import truncate_word
+from sqlalchemy import text
 from dotenv import load_dotenv
-import json
+from typing import Optional, AsyncIterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
 
 load_dotenv()
 
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+
 class Chatbot:
-    def __init__(self):
+    def __init__(self, db: Optional[DBService] = None):
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-flash-latest",
             temperature=0.4
@@ -24,14 +36,15 @@ class Chatbot:
         # )
         self.index_name = "sicupang-rag-small"
         self.text_field = "text"
-        self.embed_model = OpenAIEmbeddings(model="text-embedding-3-small")
+        self.embed_model = get_cached_embeddings("text-embedding-3-small")
         self.vectorStore = PineconeVectorStore(
             index_name=self.index_name,
             embedding=self.embed_model,
             text_key=self.text_field,
             namespace="docs"
         )
-        self.db = DBService().get_sql_database()
+        self.db_service = db or DBService()
+        self.db = self.db_service.get_sql_database()
 
         self.write_query = create_sql_query_chain(self.llm, self.db)
         
@@ -54,6 +67,10 @@ class Chatbot:
         )
         
         self.route_chain = self.router_prompt | self.llm | StrOutputParser()
+        # aturan kata kunci + centroid embedding dulu, router LLM hanya untuk yang ambigu
+        self.router = QueryRouter(self.embed_model)
+        self.answer_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+        self.sql_cache = SqlResultCache() if SQL_CACHE_ENABLED else None
 
         self.prompt_template = PromptTemplate(
             input_variables=["question", "query", "context", "result"],
@@ -80,47 +97,249 @@ class Chatbot:
                 
                 "SQL Query (hanya relevan jika route == 'sql' atau 'both'):\n"
                 "{query}\n\n"
-                "Hasil SQL (hanya relevan jika route == 'sql' atau 'both'): atau Hasil RAG (jika route == 'rag'\n"
+                "Hasil SQL (hanya relevan jika route == 'sql' atau 'both'): atau Hasil RAG (jika route == 'rag'), "
+                "untuk route == 'both' berisi keduanya dengan judul 'Hasil SQL' dan 'Hasil RAG'\n"
                 "{result}"
             )
         )
 
         self.chain = self.prompt_template | self.llm | StrOutputParser()
 
-    def ask(self, question: str):
+    def _llm_route(self, question: str, context: str):
+        # semua panggilan router LLM dicatat, termasuk balasan rusak yang jatuh ke fallback
+        route = parse_llm_route(context)
+        fallback = route is None
+        if fallback:
+            route = "sql"
+        self.router.record_llm_route(question, route, fallback=fallback)
+        return context, route
+
+    def route_question(self, question: str):
+        decision = self.router.route(question)
+        if decision is not None:
+            return decision.context_json(), decision.route
+
         context = self.route_chain.invoke({
             "question": question,
         })
-        
-        sql_clean = "-"
-        query_result = "Tidak ada hasil (karena route bukan SQL)"
-        
+        return self._llm_route(question, context)
+
+    async def aroute_question(self, question: str):
+        decision = await self.router.aroute(question)
+        if decision is not None:
+            return decision.context_json(), decision.route
+
+        context = await self.route_chain.ainvoke({
+            "question": question,
+        })
+        # append log di luar event loop (pelatihan ulang sudah di thread latar)
+        return await asyncio.to_thread(self._llm_route, question, context)
+
+    def _sql_tables(self, sql: str):
+        usable_tables = self.db.get_usable_table_names()
+        return referenced_tables(sql, usable_tables) or list(usable_tables)
+
+    def _cached_sql(self, sql: str):
+        if self.sql_cache is None:
+            return None
+        get_table_versions().start_refresher(self.db_service.engine)
+        return self.sql_cache.get(sql)
+
+    def _store_sql(self, sql: str, result, tables) -> None:
+        if self.sql_cache is not None:
+            self.sql_cache.put(sql, result, tables)
+
+    def run_sql(self, sql: str):
+        tables = self._sql_tables(sql)
+        result = self._cached_sql(sql)
+        if result is None:
+            result = self.db.run(sql)
+            self._store_sql(sql, result, tables)
+        return result, tables
+
+    async def _arun_db(self, sql: str) -> str:
+        # format sama dengan SQLDatabase.run supaya prompt & cache tidak berubah
+        async with self.db_service.async_engine.connect() as conn:
+            rows = (await conn.execute(text(sql))).fetchall()
+
+        max_length = getattr(self.db, "_max_string_length", 300)
+        result = [tuple(truncate_word(c, length=max_length) for c in row) for row in rows]
+        return str(result) if result else ""
+
+    async def arun_sql(self, sql: str):
+        if self.db_service.async_engine is None:
+            return await asyncio.to_thread(self.run_sql, sql)
+
+        tables = self._sql_tables(sql)
+        result = await asyncio.to_thread(self._cached_sql, sql)
+        if result is None:
+            result = await self._arun_db(sql)
+            self._store_sql(sql, result, tables)
+        return result, tables
+
+    def _lookup_answer(self, question: str):
+        if self.answer_cache is None:
+            return None, None
+
+        get_table_versions().start_refresher(self.db_service.engine)
+        question_vec = self.embed_model.embed_query(question)
+        return question_vec, self.answer_cache.get(question, question_vec)
+
+    async def _alookup_answer(self, question: str):
+        if self.answer_cache is None:
+            return None, None
+        # refresh versi tabel, cache embedding SQLite, dan scan cosine semuanya blocking
+        return await asyncio.to_thread(self._lookup_answer, question)
+
+    def _store_answer(self, question: str, question_vec, prepared: dict, answer: str) -> None:
+        if self.answer_cache is not None and prepared["cacheable"]:
+            self.answer_cache.put(question, question_vec, answer, prepared["tables"])
+
+    @staticmethod
+    def _clean_generated_sql(sql_raw: str) -> str:
+        return sanitize_sql(extract_select(sql_raw))
+
+    def _sql_branch(self, question: str):
+        sql_clean = self._clean_generated_sql(self.write_query.invoke({"question": question}))
         try:
-            route_data = json.loads(context.strip())
-            route = route_data.get("route", "sql")  
-        except Exception:
-            route = "sql"
+            query_result, tables = self.run_sql(sql_clean)
+        except Exception as e:
+            return sql_clean, f"ERROR SQL: {e}", [], False
+        return sql_clean, query_result, tables, True
 
-        if route in ["sql"]:
-            sql_raw = self.write_query.invoke({"question": question})
-            sql_sel = extract_select(sql_raw)
-            sql_clean = sanitize_sql(sql_sel)
+    async def _asql_branch(self, question: str):
+        sql_clean = self._clean_generated_sql(await self.write_query.ainvoke({"question": question}))
+        try:
+            query_result, tables = await self.arun_sql(sql_clean)
+        except Exception as e:
+            return sql_clean, f"ERROR SQL: {e}", [], False
+        return sql_clean, query_result, tables, True
 
-            try:
-                query_result = self.db.run(sql_clean)
-            except Exception as e:
-                query_result = f"ERROR SQL: {e}"
+    @staticmethod
+    def _merge_results(sql_branch, docs) -> tuple:
+        if isinstance(sql_branch, Exception):
+            sql_branch = ("-", f"ERROR SQL: {sql_branch}", [], False)
+        sql_clean, sql_result, tables, cacheable = sql_branch
 
-        elif route in ["rag", "both"]:
-            sql_clean = "-"
-            query_result = self.vectorStore.similarity_search(query=question, k=3, namespace="docs")
-        
-        print("Route context:", context) 
+        merged = (
+            f"Hasil SQL:\n{sql_result}\n\n"
+            f"Hasil RAG (dokumen resmi):\n{docs}"
+        )
+        return sql_clean, merged, tables, cacheable
 
-        final_answer = self.chain.invoke({
-            "question": question,
+    @staticmethod
+    def _prepared(context: str, route: str, branch) -> dict:
+        sql_clean, query_result, tables, cacheable = branch
+        print("Route context:", context) 
+        return {
             "context": context,
+            "route": route,
             "query": sql_clean,
-            "result": query_result
-        })
+            "result": query_result,
+            "tables": tables,
+            "cacheable": cacheable,
+        }
+
+    # SQL/RAG sesuai route, semua yang dibutuhkan prompt final
+    def _execute(self, question: str, context: str, route: str) -> dict:
+        if route == "both":
+            # SQL di thread lain sementara retrieval jalan, waktu total = cabang terlama
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                sql_future = pool.submit(self._sql_branch, question)
+                docs = self.vectorStore.similarity_search(query=question, k=3, namespace="docs")
+                try:
+                    sql_branch = sql_future.result()
+                except Exception as e:
+                    sql_branch = e
+            return self._prepared(context, route, self._merge_results(sql_branch, docs))
+
+        if route == "rag":
+            docs = self.vectorStore.similarity_search(query=question, k=3, namespace="docs")
+            return self._prepared(context, route, ("-", docs, [], True))
+
+        return self._prepared(context, route, self._sql_branch(question))
+
+    async def _aexecute(self, question: str, context: str, route: str) -> dict:
+        if route == "both":
+            sql_branch, docs = await asyncio.gather(
+                self._asql_branch(question),
+                self.vectorStore.asimilarity_search(query=question, k=3, namespace="docs"),
+                return_exceptions=True
+            )
+            if isinstance(docs, Exception):
+                raise docs
+            return self._prepared(context, route, self._merge_results(sql_branch, docs))
+
+        if route == "rag":
+            docs = await self.vectorStore.asimilarity_search(query=question, k=3, namespace="docs")
+            return self._prepared(context, route, ("-", docs, [], True))
+
+        return self._prepared(context, route, await self._asql_branch(question))
+
+    # routing + SQL/RAG
+    def _prepare(self, question: str) -> dict:
+        context, route = self.route_question(question)
+        return self._execute(question, context, route)
+
+    async def _aprepare(self, question: str) -> dict:
+        context, route = await self.aroute_question(question)
+        return await self._aexecute(question, context, route)
+
+    def _chain_inputs(self, question: str, prepared: dict) -> dict:
+        return {
+            "question": question,
+            "context": prepared["context"],
+            "query": prepared["query"],
+            "result": prepared["result"]
+        }
+
+    def ask(self, question: str):
+        question_vec, cached = self._lookup_answer(question)
+        if cached is not None:
+            return cached
+
+        prepared = self._prepare(question)
+        final_answer = self.chain.invoke(self._chain_inputs(question, prepared))
+
+        self._store_answer(question, question_vec, prepared, final_answer)
+        return final_answer
+
+    async def aask(self, question: str):
+        question_vec, cached = await self._alookup_answer(question)
+        if cached is not None:
+            return cached
+
+        prepared = await self._aprepare(question)
+        final_answer = await self.chain.ainvoke(self._chain_inputs(question, prepared))
+
+        self._store_answer(question, question_vec, prepared, final_answer)
         return final_answer
+
+    # Generator event (nama, data) untuk SSE: "meta" (route) dikirim begitu routing
+    # selesai, "query" (SQL) setelah SQL/RAG dijalankan, lalu "token" per potongan
+    # jawaban, diakhiri "done".
+    async def astream_answer(self, question: str) -> AsyncIterator[Tuple[str, dict]]:
+        question_vec, cached = await self._alookup_answer(question)
+        if cached is not None:
+            yield "meta", {"cached": True}
+            yield "token", {"text": cached}
+            yield "done", {}
+            return
+
+        context, route = await self.aroute_question(question)
+        yield "meta", {
+            "cached": False,
+            "route": route,
+            "context": context,
+        }
+
+        prepared = await self._aexecute(question, context, route)
+        yield "query", {"query": prepared["query"]}
+
+        parts = []
+        async for chunk in self.chain.astream(self._chain_inputs(question, prepared)):
+            parts.append(chunk)
+            yield "token", {"text": chunk}
+
+        self._store_answer(question, question_vec, prepared, "".join(parts))
+        yield "done", {}
@@ -1,24 +1,37 @@
 import os
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable, Awaitable
 import json
 import re
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import date
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import SystemMessage, HumanMessage
 from app.db.database import DBService
-from app.db.models.household_food import HouseholdFood, InsertHouseholdFood
-from app.db.models.food_recipe import get_resep_by_nama, InsertFoodRecipe, FoodRecipe
-from app.db.models.food_ingredient import get_pangan_by_nama_fuzzy
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from app.db.models.household_food import (
+    HouseholdFood, InsertHouseholdFood, InsertHouseholdFoodBulk,
+    InsertHouseholdFoodAsync, InsertHouseholdFoodBulkAsync
+)
+from app.db.models.food_recipe import (
+    get_resep_by_nama_bulk, get_resep_by_nama_bulk_async,
+    InsertFoodRecipe, InsertFoodRecipeAsync, FoodRecipe
+)
+from app.db.models.food_ingredient import get_pangan_by_nama_fuzzy, get_pangan_by_nama_fuzzy_async
+from app.services.cache.embedding_cache import get_cached_embeddings
+from app.services.vector.local_index import get_recipe_index
 from app.schemas.request_model import FoodInput
 from starlette.concurrency import run_in_threadpool
 from decimal import Decimal
 
+RETRIEVAL_CONCURRENCY = int(os.getenv("RETRIEVAL_CONCURRENCY", "8"))
+
+# pasangan (baris pangan_keluarga yang akan di-insert, status untuk client)
+PendingRow = Tuple[HouseholdFood, Dict[str, Any]]
+DBSession = Union[Session, AsyncSession]
 
 class IngredientExtract:
-    def __init__(self, model="gemini-2.5-flash"):
+    def __init__(self, model="gemini-2.5-flash", db: Optional[DBService] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("API key tidak ditemukan")
@@ -30,25 +43,27 @@ class IngredientExtract:
 
         self.index_name = "sicupang-rag-small"
         self.namespace = "recipes"
-        self.db = DBService()
-
-        self.embed_model = OpenAIEmbeddings(model="text-embedding-3-small")
-        self.vectorStore = PineconeVectorStore(
-            index_name=self.index_name,
-            embedding=self.embed_model,
-            text_key="ingredients",
-            namespace="recipes"
-        )
+        self.db = db or DBService()
+
+        self.embed_model = get_cached_embeddings("text-embedding-3-small")
+        # backend dipilih lewat VECTOR_BACKEND (pinecone | local)
+        self.recipe_index = get_recipe_index(self.index_name)
 
-    async def _process_and_insert_ingredients_from_cache(
+    # Session sync dijalankan di threadpool, AsyncSession di-await langsung di event loop
+    async def _run_db(self, sync_fn: Callable[..., Any], async_fn: Callable[..., Awaitable[Any]], *args, session: DBSession):
+        if isinstance(session, AsyncSession):
+            return await async_fn(*args, session)
+        return await run_in_threadpool(sync_fn, *args, session)
+
+    async def _prepare_ingredients_from_cache(
         self, 
         food_name: str, 
         portion_input: float, 
         resep_data: Dict[str, Any], 
         id_keluarga: int, 
         today: date, 
-        session: Session
-    ) -> List[Dict[str, Any]]:
+        session: DBSession
+    ) -> List[PendingRow]:
         
         bahan_parsed: List[Dict[str, Any]] = resep_data.get("bahan_parsed", [])
         std_portion = resep_data.get("standar_porsi", 0)
@@ -82,35 +97,26 @@ class IngredientExtract:
                 urt=urt_value,
                 tanggal=today
             )
-    
-            try:
-                inserted_record = await run_in_threadpool(
-                    InsertHouseholdFood,
-                    bahan_pangan,
-                    session
-                )
 
-                temp_results.append({
-                        "food_name" : food_name,
-                        "ingredient_name": nama_bahan,
-                        "id_pangan": inserted_record.id_pangan,
-                        "urt": float(inserted_record.urt),
-                        "status": "Sukses Insert"
-                    })
-            except Exception as e:
-                print(f"❌ Gagal insert data {id_pangan} untuk {food_name}: {e}")
+            temp_results.append((bahan_pangan, {
+                    "food_name" : food_name,
+                    "ingredient_name": nama_bahan,
+                    "id_pangan": id_pangan,
+                    "urt": float(urt_value),
+                    "status": "Sukses Insert"
+                }))
                 
         return temp_results
     
-    async def _process_and_insert_ingredients_from_rag(
+    async def _prepare_ingredients_from_rag(
         self, 
         food_name: str, 
         portion_input: float, 
         resep_data: Dict[str, Any], 
         id_keluarga: int, 
         today: date, 
-        session: Session
-    ) -> List[Dict[str, Any]]:
+        session: DBSession
+    ) -> Tuple[List[PendingRow], Optional[FoodRecipe]]:
        
         bahan_parsed: List[Dict[str, Any]] = resep_data.get('bahan_parsed', [])
         resep_id_vdb = resep_data['resep_id_vdb']
@@ -118,7 +124,7 @@ class IngredientExtract:
         
         if std_portion <= 0:
             print(f"⚠️ Error: Estimasi porsi standar {food_name} adalah nol setelah RAG.")
-            return []
+            return [], None
 
         faktor_skala = portion_input / std_portion
         
@@ -135,10 +141,11 @@ class IngredientExtract:
             jumlah_standar = item['jumlah_standar']
             satuan_konversi = item['satuan_konversi']
             
-            bahan_entry = await run_in_threadpool(
+            bahan_entry = await self._run_db(
                 get_pangan_by_nama_fuzzy,
+                get_pangan_by_nama_fuzzy_async,
                 nama_bahan,
-                session
+                session=session
             )
             
             if bahan_entry:
@@ -171,61 +178,92 @@ class IngredientExtract:
                 urt=urt_value,
                 tanggal=today
                 )
-        
                 
-                try:
-                    inserted_record = await run_in_threadpool(
-                        InsertHouseholdFood,
-                        new_pangan_keluarga,
-                        session
-                    )
-                    
-                    temp_results.append({
-                        "food_name" : food_name,
-                        "ingredient_name": bahan_entry.nama_pangan,
-                        "id_pangan": inserted_record.id_pangan,
-                        "urt": float(inserted_record.urt),
-                        "status": "Sukses Insert"
-                    })
-                except Exception as e:
-                    print(f"❌ Gagal insert data {id_pangan} untuk {food_name}: {e}")
-                    
+                temp_results.append((new_pangan_keluarga, {
+                    "food_name" : food_name,
+                    "ingredient_name": bahan_entry.nama_pangan,
+                    "id_pangan": id_pangan,
+                    "urt": float(urt_value),
+                    "status": "Sukses Insert"
+                }))
+
+        # resep baru di-insert setelah pangan_keluarga, lihat _insert_recipes
         recipe_cache = FoodRecipe(
             nama_olahan=food_name,
             id_resep_vektor_db=resep_id_vdb,
             uraian_bahan=uraian_bahan_json,
             standar_porsi=std_portion,
         )
-                    
-        await run_in_threadpool(
-            InsertFoodRecipe,
-            recipe_cache,
-            session
-        )
         
-        return temp_results
+        return temp_results, recipe_cache
+
+    async def _rollback(self, session: DBSession):
+        if isinstance(session, AsyncSession):
+            await session.rollback()
+        else:
+            await run_in_threadpool(session.rollback)
+
+    async def _insert_recipes(self, recipes: List[FoodRecipe], session: DBSession):
+        # cache resep hanya pelengkap: gagal insert satu resep tidak membatalkan makanan lain
+        for recipe in recipes:
+            try:
+                await self._run_db(InsertFoodRecipe, InsertFoodRecipeAsync, recipe, session=session)
+            except Exception as e:
+                await self._rollback(session)
+                print(f"⚠️ Gagal menyimpan cache resep {recipe.nama_olahan}: {e}")
          
-    async def searchingFood(self, items: List[FoodInput], id_keluarga: int, session: Session):
+    async def _insert_household_rows(self, pending_groups: List[List[PendingRow]], session: DBSession) -> List[List[Dict[str, Any]]]:
+        rows = [row for group in pending_groups for row, _ in group]
+        if not rows:
+            return [[] for _ in pending_groups]
+
+        try:
+            await self._run_db(InsertHouseholdFoodBulk, InsertHouseholdFoodBulkAsync, rows, session=session)
+            print(f"✅ {len(rows)} data pangan keluarga di-insert dalam satu transaksi")
+            return [[status for _, status in group] for group in pending_groups]
+        except Exception as e:
+            print(f"⚠️ Bulk insert gagal, mencoba insert per baris: {e}")
+
+        # fallback per baris supaya baris yang valid tetap tersimpan seperti sebelumnya
         results = []
+        for group in pending_groups:
+            group_results = []
+            for row, status in group:
+                try:
+                    await self._run_db(InsertHouseholdFood, InsertHouseholdFoodAsync, row, session=session)
+                    group_results.append(status)
+                except Exception as e:
+                    await self._rollback(session)
+                    print(f"❌ Gagal insert data {row.id_pangan} untuk {status['food_name']}: {e}")
+            results.append(group_results)
+        return results
+
+    async def searchingFood(self, items: List[FoodInput], id_keluarga: int, session: DBSession):
+        pending_groups: List[List[PendingRow]] = []
+        new_recipes: List[FoodRecipe] = []
         uncached_items: List[FoodInput] = [] 
         today = date.today()
 
+        # satu query IN (...) untuk seluruh batch
+        cached_recipes = await self._run_db(
+            get_resep_by_nama_bulk,
+            get_resep_by_nama_bulk_async,
+            [item.food_name.strip() for item in items],
+            session=session
+        )
+
         for item in items:
             food_name = item.food_name.strip()
             portion_input = item.portion
 
-            cache_entry = await run_in_threadpool(
-                get_resep_by_nama,
-                food_name,
-                session
-            )
+            cache_entry = cached_recipes.get(food_name)
 
             if cache_entry:
                 print(f"✅ Ditemukan di cache: {food_name}")
                 
                 bahan_parsed: List[Dict[str, Any]] = cache_entry.uraian_bahan
                 
-                cache_insert_results = await self._process_and_insert_ingredients_from_cache(
+                cache_pending_rows = await self._prepare_ingredients_from_cache(
                     food_name,
                     portion_input,
                     bahan_parsed,
@@ -235,7 +273,7 @@ class IngredientExtract:
                     )
                 
 
-                results.append(cache_insert_results)
+                pending_groups.append(cache_pending_rows)
                         
 
             else:
@@ -259,7 +297,7 @@ class IngredientExtract:
                 
                 if rag_data_for_food:
                     
-                    rag_insert_result = await self._process_and_insert_ingredients_from_rag(
+                    rag_pending_rows, recipe_cache = await self._prepare_ingredients_from_rag(
                     food_name=food_name,
                     portion_input=portion_input,
                     resep_data=rag_data_for_food,
@@ -268,35 +306,51 @@ class IngredientExtract:
                     session=session
                 )
             
-                    results.append(rag_insert_result)
+                    pending_groups.append(rag_pending_rows)
+                    if recipe_cache is not None:
+                        new_recipes.append(recipe_cache)
                     
                 else:
                     print(f"❌ Gagal mendapatkan hasil RAG untuk: {food_name}")
 
+        results = await self._insert_household_rows(pending_groups, session)
+        await self._insert_recipes(new_recipes, session)
         return results
 
-    async def build_augmented_message_bulk(self, food_names: List[str], session: Session, k: int = 1) -> Dict[str, Optional[Dict[str, Any]]]:
+    def _build_vdb_query(self, food_name: str) -> str:
+        query_base = re.sub(r'\b(nasi|ketupat|lontong|)\b', '', food_name, flags=re.IGNORECASE).strip()
+        
+        if not query_base or len(query_base) < 3:
+            return food_name
+        return query_base
+
+    async def build_augmented_message_bulk(self, food_names: List[str], session: DBSession, k: int = 1) -> Dict[str, Optional[Dict[str, Any]]]:
         combined_vdb_context = ""
         vdb_data_map = {} 
 
-        for food_name in food_names:
-            
-            query_base = re.sub(r'\b(nasi|ketupat|lontong|)\b', '', food_name, flags=re.IGNORECASE).strip()
-            
-            if not query_base or len(query_base) < 3:
-                query_vdb = food_name
-            else:
-                query_vdb = query_base
-            
-            query_vector = await run_in_threadpool(self.embed_model.embed_query, query_vdb)
-            results = await run_in_threadpool(
-                self.vectorStore._index.query,
-                vector=query_vector,
-                top_k=k,
-                namespace="recipes",
-                include_metadata=True
-            )
-            
+        query_texts = [self._build_vdb_query(food_name) for food_name in food_names]
+
+        # satu panggilan embedding untuk seluruh batch
+        query_vectors: List[List[float]] = []
+        if query_texts:
+            query_vectors = await run_in_threadpool(self.embed_model.embed_documents, query_texts)
+
+        semaphore = asyncio.Semaphore(RETRIEVAL_CONCURRENCY)
+
+        async def query_index(query_vector: List[float]):
+            async with semaphore:
+                return await run_in_threadpool(
+                    self.recipe_index.query,
+                    vector=query_vector,
+                    top_k=k,
+                    namespace="recipes",
+                    include_metadata=True
+                )
+
+        # hasil gather mengikuti urutan food_names
+        all_results = await asyncio.gather(*[query_index(vec) for vec in query_vectors])
+
+        for food_name, results in zip(food_names, all_results):
             if results['matches']:
                 first_match = results['matches'][0]
                 ingredients_text = first_match['metadata']['content']
@@ -1,20 +1,36 @@
 import os
 import re
 import json
-from sqlalchemy import text
+import logging
+from typing import Optional, List, Dict
+from sqlmodel import Session
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import create_sql_query_chain
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from app.db.database import DBService
+from app.db.models.food_price import LatestPriceSnapshot, get_latest_prices
+from app.db.models.food_ingredient import get_pangan_catalog
+from app.db.models.food_measure import get_takaran_names
+from app.helper.allergen import parse_alergi, contains_allergen
+from app.helper.takaran import unit_grams
+from app.services.feature.budget_optimizer import BudgetOptimizer, FoodCandidate, format_jumlah, default_manfaat
+from app.services.feature.price_context import build_price_context
+from app.services.cache.recommendation_cache import RecommendationCache
 from app.helper.clean_sql import extract_select, sanitize_sql
 from langchain_core.output_parsers import StrOutputParser
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# "optimizer": keranjang dipilih BudgetOptimizer, LLM hanya menulis manfaat
+# "llm": seluruh rencana dibuat LLM dari daftar harga
+RECOMMENDATION_ENGINE = os.getenv("RECOMMENDATION_ENGINE", "optimizer").strip().lower()
+
 class IngredientRecommend:
-    def __init__(self, model="gemini-1.5-flash-latest"):
+    def __init__(self, model="gemini-1.5-flash-latest", db: Optional[DBService] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("API key tidak ditemukan")
@@ -29,23 +45,30 @@ class IngredientRecommend:
         # temperature=0.4
         # )
 
-        self.db = DBService().get_sql_database()
+        self.db_service = db or DBService()
+        self.db = self.db_service.get_sql_database()
         self.write_query = create_sql_query_chain(self.llm, self.db)
+        self.prices = get_latest_prices()
+        self.optimizer = BudgetOptimizer()
+        self.cache = RecommendationCache()
+        # versi snapshot harga terakhir yang pangan tanpa satuan beratnya sudah di-log
+        self._unit_warning_version: Optional[int] = None
 
         self.prompt_template_recommendation = PromptTemplate(
             input_variables=['jumlah_keluarga', 'budget', 'price_context', 'alergi'],
             template="""
     Anda adalah asisten gizi. Buat rencana bahan makanan bergizi untuk {jumlah_keluarga} orang selama 1 bulan, dengan total budget Rp{budget}.
 
-    tugasmu adalah membaca keseluruhan data dalam bentuk list yang rapi secara lengkap sesuai
-            dengan pertanyaan pengguna : {price_context} Anda harus membuat rencana ini HANYA dan HANYA MENGGUNAKAN bahan-bahan yang tercantum dalam data tersebut
+    Daftar harga (satu baris per bahan, kolom dipisah "|", sudah tanpa bahan alergen, urut dari gizi per rupiah tertinggi):
+{price_context}
 
+Anda harus membuat rencana ini HANYA dan HANYA MENGGUNAKAN bahan-bahan yang tercantum dalam daftar harga di atas.
 **JANGAN MENGAMBIL INFORMASI atau MENCIPTAKAN BAHAN PANGAN yang tidak ada dalam daftar yang disediakan.**
-Jika suatu bahan tidak ada di {price_context}, JANGAN masukkan ke hasil. 
+Jika suatu bahan tidak ada di daftar, JANGAN masukkan ke hasil. 
 Jangan improvisasi.
 **ATURAN WAJIB:**
-- HANYA gunakan bahan yang tercantum dalam data {price_context}
-- Nama bahan HARUS sama persis dengan "nama_pangan" di data
+- HANYA gunakan bahan yang tercantum dalam daftar harga
+- Nama bahan HARUS sama persis dengan kolom "nama" di daftar
 - JANGAN buat nama bahan baru atau improvisasi
 - MAKSIMALKAN budget (target: 90-100% dari budget total), apabila total_perkiraan_pengeluaran masih belum mencapai target budget, tambahkan kuantitas dari bahan yang sudah ada
 - Pertimbangkan alergi: {alergi}
@@ -75,52 +98,24 @@ Jangan sertakan teks lain di luar JSON.
 
         self.chain = self.prompt_template_recommendation | self.llm | StrOutputParser()
 
-    def get_recommendation(self, jumlah_keluarga: int, budget: int, alergi: str):
-        sql_query = """
-        SELECT JSON_ARRAYAGG(
-                 JSON_OBJECT(
-                   'nama', nama_pangan,
-                   'harga', CAST(harga_satuan AS DECIMAL(12,2))
-                 )
-               ) AS price_context_json
-        FROM (
-          WITH hp_rank AS (
-            SELECT
-              id_pangan,
-              harga_satuan,
-              tanggal,
-              ROW_NUMBER() OVER (
-                PARTITION BY id_pangan
-                ORDER BY tanggal DESC, id_harga DESC
-              ) AS rn
-            FROM harga_pangan
-          )
-          SELECT p.nama_pangan, h.harga_satuan
-          FROM pangan p
-          JOIN hp_rank h
-            ON h.id_pangan = p.id_pangan AND h.rn = 1
-          ORDER BY p.nama_pangan
-        ) q;
-        """
+        self.prompt_template_manfaat = PromptTemplate(
+            input_variables=['jumlah_keluarga', 'alergi', 'bahan'],
+            template="""
+Anda adalah asisten gizi. Berikut rencana belanja bahan makanan 1 bulan untuk keluarga {jumlah_keluarga} orang
+(alergi yang dihindari: {alergi}). Jumlah dan harga sudah final, JANGAN mengubah atau menambah bahan.
 
-        engine = getattr(self.db, "engine", None) or getattr(self.db, "_engine", None)
-        if engine is None:
-            raise RuntimeError("SQLAlchemy engine tidak ditemukan dari SQLDatabase")
+{bahan}
 
-        with engine.connect() as conn:
-            json_str = conn.execute(text(sql_query)).scalar()
-            if not json_str:
-                json_str = "[]"
+Tulis manfaat gizi singkat (maksimal 1 kalimat) untuk setiap bahan di atas.
+Balas hanya dalam format JSON valid: {{"nama bahan persis seperti di daftar": "manfaat"}}
+Jangan sertakan teks lain di luar JSON.
+"""
+        )
 
-        price_context = json_str
+        self.manfaat_chain = self.prompt_template_manfaat | self.llm | StrOutputParser()
 
-        result = self.chain.invoke({
-            "jumlah_keluarga": jumlah_keluarga,
-            "budget": budget,
-            "price_context": price_context,
-            "alergi": alergi
-        })
-        
+    @staticmethod
+    def _parse_json(result: str):
         match = re.search(r"```json\s*(.*?)\s*```", result, re.DOTALL)
         json_str = match.group(1) if match else result
         try:
@@ -128,3 +123,126 @@ Jangan sertakan teks lain di luar JSON.
         except json.JSONDecodeError as e:
             print(f":warning: Gagal parse JSON: {e}")
             return None
+
+    def _candidates(self, engine, prices: LatestPriceSnapshot, alergi: str) -> List[FoodCandidate]:
+        terms = parse_alergi(alergi)
+        takaran = get_takaran_names(engine)
+        with Session(engine) as session:
+            catalog = get_pangan_catalog().ensure_loaded(session)
+
+            candidates = []
+            for price in prices.items():
+                if terms and contains_allergen(price.nama, terms):
+                    continue
+                pangan = catalog.get_by_id(price.id_pangan, session)
+                if pangan is None:
+                    continue
+                # harga_satuan berlaku per takaran pangan; unit_gram None -> hanya harga asli
+                # (konteks LLM), tidak ikut optimizer yang butuh harga per gram
+                nama_takaran = takaran.get(pangan.id_takaran, "")
+                candidates.append(FoodCandidate(
+                    id_pangan=price.id_pangan,
+                    nama=price.nama,
+                    harga=float(price.harga),
+                    gram=float(pangan.gram),
+                    kalori=float(pangan.kalori),
+                    protein=float(pangan.protein),
+                    takaran=nama_takaran,
+                    unit_gram=unit_grams(nama_takaran, pangan.referensi_urt, pangan.referensi_gram_berat),
+                ))
+
+        self._warn_unknown_units(candidates, prices.version)
+        return candidates
+
+    def _warn_unknown_units(self, candidates: List[FoodCandidate], version: int) -> None:
+        # sekali per versi snapshot harga, bukan setiap request
+        if self._unit_warning_version == version:
+            return
+        self._unit_warning_version = version
+
+        unknown = [c.nama for c in candidates if c.unit_gram is None]
+        if unknown:
+            logger.warning(
+                "%d pangan tanpa takaran berat, tidak dipakai optimizer: %s",
+                len(unknown), ", ".join(unknown[:10])
+            )
+
+    def _write_manfaat(self, plan: dict, jumlah_keluarga: int, alergi: str) -> Dict[str, str]:
+        bahan = "\n".join(
+            f"- {item['nama']}: {format_jumlah(item['gram'])}, {item['kalori']:.0f} kkal, {item['protein']:.0f} g protein"
+            for item in plan["items"]
+        )
+        result = self.manfaat_chain.invoke({
+            "jumlah_keluarga": jumlah_keluarga,
+            "alergi": alergi,
+            "bahan": bahan
+        })
+        parsed = self._parse_json(result)
+        return parsed if isinstance(parsed, dict) else {}
+
+    def _recommend_optimized(self, engine, prices: LatestPriceSnapshot, jumlah_keluarga: int, budget: int, alergi: str, fast: bool):
+        candidates = self._candidates(engine, prices, alergi)
+        plan = self.optimizer.optimize(candidates, jumlah_keluarga, budget)
+
+        manfaat: Dict[str, str] = {}
+        if not fast and plan["items"]:
+            try:
+                manfaat = self._write_manfaat(plan, jumlah_keluarga, alergi)
+            except Exception as e:
+                print(f"⚠️ Gagal membuat narasi manfaat: {e}")
+
+        return {
+            "bahan_makanan": [
+                {
+                    "nama": item["nama"],
+                    "jumlah": format_jumlah(item["gram"]),
+                    "harga": item["harga"],
+                    "manfaat": manfaat.get(item["nama"]) or default_manfaat(item),
+                }
+                for item in plan["items"]
+            ],
+            "total_perkiraan_pengeluaran": plan["total"],
+            "ringkasan_gizi": {
+                "kalori": round(plan["kalori"]),
+                "protein": round(plan["protein"]),
+                "target_kalori": round(plan["target_kalori"]),
+                "target_protein": round(plan["target_protein"]),
+            },
+        }
+
+    def _recommend_llm(self, engine, prices: LatestPriceSnapshot, jumlah_keluarga: int, budget: int, alergi: str):
+        price_context = build_price_context(self._candidates(engine, prices, alergi))
+
+        result = self.chain.invoke({
+            "jumlah_keluarga": jumlah_keluarga,
+            "budget": budget,
+            "price_context": price_context,
+            "alergi": alergi
+        })
+        return self._parse_json(result)
+
+    def get_recommendation(self, jumlah_keluarga: int, budget: int, alergi: str, fast: bool = False):
+        engine = getattr(self.db, "engine", None) or getattr(self.db, "_engine", None)
+        if engine is None:
+            raise RuntimeError("SQLAlchemy engine tidak ditemukan dari SQLDatabase")
+
+        # harga terbaru per pangan dari snapshot in-process (refresh incremental)
+        prices = self.prices.refresh(engine)
+
+        mode = RECOMMENDATION_ENGINE
+        if mode == "optimizer" and fast:
+            mode = "optimizer-fast"
+
+        # budget yang berdekatan (bucket relatif) berbagi hasil selama totalnya muat di budget ini
+        key = self.cache.key(jumlah_keluarga, budget, alergi, prices.version, mode)
+        cached = self.cache.get(key, budget)
+        if cached is not None:
+            return cached
+
+        if RECOMMENDATION_ENGINE == "optimizer":
+            result = self._recommend_optimized(engine, prices, jumlah_keluarga, budget, alergi, fast)
+        else:
+            result = self._recommend_llm(engine, prices, jumlah_keluarga, budget, alergi)
+
+        self.cache.put(key, result)
+        return result
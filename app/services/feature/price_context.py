@@ -0,0 +1,53 @@
+import os
+from typing import List
+
+from dotenv import load_dotenv
+
+from app.services.feature.budget_optimizer import FoodCandidate, KALORI_HARIAN, PROTEIN_HARIAN
+
+load_dotenv()
+
+PRICE_CONTEXT_TOKEN_BUDGET = int(os.getenv("PRICE_CONTEXT_TOKEN_BUDGET", "1500"))
+# perkiraan kasar tanpa tokenizer: ~4 karakter per token
+CHARS_PER_TOKEN = 4
+
+# harga_per_kg dinormalisasi dari takaran pangan ("-" jika takaran bukan satuan berat),
+# harga_satuan adalah harga asli per takaran (mis. 5000/ikat)
+PRICE_CONTEXT_HEADER = "nama|harga_per_kg|harga_satuan|kkal_100g|protein_100g"
+
+
+def nutrient_per_rupiah(candidate: FoodCandidate) -> float:
+    # kalori + protein (relatif AKG harian) per rupiah untuk satu unit harga
+    if candidate.harga <= 0 or candidate.gram <= 0 or not candidate.unit_gram:
+        return 0.0
+    unit = candidate.unit_gram / candidate.gram
+    gizi = candidate.kalori * unit / KALORI_HARIAN + candidate.protein * unit / PROTEIN_HARIAN
+    return gizi / candidate.harga
+
+
+def _row(candidate: FoodCandidate) -> str:
+    per_100g = 100 / candidate.gram if candidate.gram > 0 else 0
+    nama = candidate.nama.replace("|", "/")
+    per_kg = f"{candidate.harga * 1000 / candidate.unit_gram:.0f}" if candidate.unit_gram else "-"
+    takaran = (candidate.takaran or "-").replace("|", "/")
+    return (
+        f"{nama}|{per_kg}|{candidate.harga:.0f}/{takaran}|"
+        f"{candidate.kalori * per_100g:.0f}|{candidate.protein * per_100g:.1f}"
+    )
+
+
+# Daftar harga ringkas untuk prompt: kandidat (sudah bebas alergen) diurutkan menurut
+# gizi per rupiah lalu ditulis sebagai tabel pipe-separated sampai token_budget habis.
+def build_price_context(candidates: List[FoodCandidate], token_budget: int = PRICE_CONTEXT_TOKEN_BUDGET) -> str:
+    ranked = sorted(candidates, key=nutrient_per_rupiah, reverse=True)
+
+    lines = [PRICE_CONTEXT_HEADER]
+    budget_chars = token_budget * CHARS_PER_TOKEN - len(PRICE_CONTEXT_HEADER) - 1
+    for candidate in ranked:
+        row = _row(candidate)
+        if len(row) + 1 > budget_chars:
+            break
+        lines.append(row)
+        budget_chars -= len(row) + 1
+
+    return "\n".join(lines)
@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import threading
+from typing import List, Dict, Any, Optional, NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+ROUTE_LOG_PATH = os.getenv("ROUTE_LOG_PATH", "cache/route_log.jsonl")
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "20"))
+ROUTER_RETRAIN_EVERY = int(os.getenv("ROUTER_RETRAIN_EVERY", "50"))
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.45"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+
+ROUTES = ("sql", "rag", "both")
+
+# entitas yang jelas ada di tabel SQL (desa, harga_pangan, kader, kecamatan, keluarga, stok_pangan, ...)
+SQL_ENTITY_TERMS = [
+    "harga", "harga_pangan", "stok", "stok_pangan", "kecamatan", "desa", "kelurahan",
+    "keluarga", "pangan_keluarga", "kader", "takaran", "jenis_pangan", "rentang_uang",
+    "pendapatan", "pengeluaran",
+]
+# permintaan angka / agregasi / ranking
+SQL_INTENT_TERMS = [
+    "berapa", "jumlah", "total", "rata-rata", "rata rata", "rerata", "tertinggi", "terendah",
+    "termahal", "termurah", "terbanyak", "tersedikit", "paling", "ranking", "peringkat",
+    "urutkan", "daftar", "tren", "persentase", "bulan ini", "tahun ini", "minggu ini",
+]
+# konteks kebijakan / definisi / naratif dari dokumen
+RAG_TERMS = [
+    "apa itu", "apa yang dimaksud", "definisi", "pengertian", "kebijakan", "regulasi",
+    "peraturan", "perda", "pedoman", "juknis", "strategi", "program", "jelaskan",
+    "mengapa", "kenapa", "bagaimana cara", "indikator", "tujuan", "dokumen", "laporan",
+    "ketahanan pangan", "pola pangan harapan", "b2sa", "stunting", "saran", "rekomendasi",
+]
+
+
+def _compile_terms(terms: List[str]) -> re.Pattern:
+    escaped = sorted((re.escape(t) for t in terms), key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(escaped) + r")\b", flags=re.IGNORECASE)
+
+
+_SQL_ENTITY_RE = _compile_terms(SQL_ENTITY_TERMS)
+_SQL_INTENT_RE = _compile_terms(SQL_INTENT_TERMS)
+_RAG_RE = _compile_terms(RAG_TERMS)
+_JSON_OBJECT_RE = re.compile(r"\{.*?\}", flags=re.DOTALL)
+
+
+def parse_llm_route(reply: str) -> Optional[str]:
+    # balasan router LLM kadang dibungkus ```json ... ``` atau diberi teks tambahan
+    match = _JSON_OBJECT_RE.search(reply or "")
+    if match is None:
+        return None
+    try:
+        route = json.loads(match.group(0)).get("route")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return route if route in ROUTES else None
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    reason: str
+    source: str
+
+    def context_json(self) -> str:
+        return json.dumps({"route": self.route, "reason": self.reason}, ensure_ascii=False)
+
+
+# Router lokal sebelum router LLM: aturan kata kunci, lalu centroid embedding yang
+# dilatih dari rute hasil LLM yang dicatat. None berarti serahkan ke LLM.
+# Setiap panggilan router LLM dicatat (termasuk balasan yang tidak bisa di-parse dan
+# memakai rute fallback); entri fallback tidak dipakai untuk melatih centroid.
+# Pelatihan ulang berjalan di thread latar, tidak di jalur request.
+class QueryRouter:
+    def __init__(self, embed_model: Optional[Embeddings] = None, log_path: Optional[str] = ROUTE_LOG_PATH):
+        self.embed_model = embed_model
+        self.log_path = log_path
+
+        self._centroids: Dict[str, np.ndarray] = {}
+        self._logged_since_train = 0
+        self._training = False
+        self._lock = threading.Lock()
+        self.stats = {"rule": 0, "centroid": 0, "llm": 0, "llm_fallback": 0}
+
+        self.train_from_log()
+
+    def match_rules(self, question: str) -> Optional[RouteDecision]:
+        entities = {m.lower() for m in _SQL_ENTITY_RE.findall(question)}
+        intents = {m.lower() for m in _SQL_INTENT_RE.findall(question)}
+        rag_hits = {m.lower() for m in _RAG_RE.findall(question)}
+
+        wants_data = bool(entities) and bool(intents)
+
+        if wants_data and not rag_hits:
+            return RouteDecision("sql", f"data terstruktur: {', '.join(sorted(entities | intents))}", "rule")
+        if rag_hits and not entities and not intents:
+            return RouteDecision("rag", f"konteks dokumen: {', '.join(sorted(rag_hits))}", "rule")
+        if wants_data and rag_hits:
+            return RouteDecision("both", "butuh angka dari DB dan konteks dokumen", "rule")
+        return None
+
+    def _classify_vector(self, vector: List[float]) -> Optional[RouteDecision]:
+        if len(self._centroids) < 2:
+            return None
+
+        query_vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vec)
+        if norm == 0:
+            return None
+        query_vec = query_vec / norm
+
+        scored = sorted(
+            ((float(centroid @ query_vec), route) for route, centroid in self._centroids.items()),
+            reverse=True
+        )
+        (best_score, best_route), (second_score, _) = scored[0], scored[1]
+
+        if best_score < ROUTER_MIN_SIMILARITY or best_score - second_score < ROUTER_MIN_MARGIN:
+            return None
+        return RouteDecision(best_route, f"mirip pertanyaan '{best_route}' sebelumnya ({best_score:.2f})", "centroid")
+
+    def _count(self, decision: Optional[RouteDecision]) -> Optional[RouteDecision]:
+        if decision is not None:
+            with self._lock:
+                self.stats[decision.source] += 1
+        return decision
+
+    def route(self, question: str) -> Optional[RouteDecision]:
+        decision = self.match_rules(question)
+        if decision is None and self._centroids and self.embed_model is not None:
+            decision = self._classify_vector(self.embed_model.embed_query(question))
+        return self._count(decision)
+
+    async def aroute(self, question: str) -> Optional[RouteDecision]:
+        decision = self.match_rules(question)
+        if decision is None and self._centroids and self.embed_model is not None:
+            decision = self._classify_vector(await self.embed_model.aembed_query(question))
+        return self._count(decision)
+
+    def record_llm_route(self, question: str, route: str, fallback: bool = False) -> None:
+        with self._lock:
+            self.stats["llm"] += 1
+            if fallback:
+                self.stats["llm_fallback"] += 1
+
+        if not self.log_path:
+            return
+
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        entry = {"question": question, "route": route}
+        if fallback:
+            entry["fallback"] = True
+
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if not fallback:
+                self._logged_since_train += 1
+            should_retrain = self._logged_since_train >= ROUTER_RETRAIN_EVERY and not self._training
+            if should_retrain:
+                self._training = True
+                self._logged_since_train = 0
+
+        if should_retrain:
+            threading.Thread(target=self._train_in_background, daemon=True).start()
+
+    def _train_in_background(self) -> None:
+        try:
+            self.train_from_log()
+        finally:
+            with self._lock:
+                self._training = False
+
+    def _read_log(self) -> Dict[str, List[str]]:
+        samples: Dict[str, List[str]] = {route: [] for route in ROUTES}
+        if not self.log_path or not os.path.exists(self.log_path):
+            return samples
+
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("fallback"):
+                    continue
+                if entry.get("route") in samples and entry.get("question"):
+                    samples[entry["route"]].append(entry["question"])
+        return samples
+
+    def train_from_log(self) -> None:
+        if self.embed_model is None:
+            return
+
+        samples = self._read_log()
+        trainable = {route: qs for route, qs in samples.items() if len(qs) >= ROUTER_MIN_SAMPLES}
+
+        if len(trainable) < 2:
+            return
+
+        try:
+            centroids: Dict[str, np.ndarray] = {}
+            for route, questions in trainable.items():
+                matrix = np.asarray(self.embed_model.embed_documents(questions), dtype=np.float32)
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                centroid = matrix.mean(axis=0)
+                centroids[route] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        except Exception as e:
+            print(f"⚠️ Gagal melatih router centroid: {e}")
+            return
+
+        self._centroids = centroids
+        print(f"✅ Router centroid dilatih: { {r: len(q) for r, q in trainable.items()} }")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        fast = stats["rule"] + stats["centroid"]
+        total = fast + stats["llm"]
+        return {
+            **stats,
+            "total": total,
+            "fast_path_rate": fast / total if total else 0.0,
+            "llm_fallback_rate": stats["llm_fallback"] / stats["llm"] if stats["llm"] else 0.0,
+            "centroid_routes": sorted(self._centroids.keys()),
+        }
@@ -0,0 +1,43 @@
+import csv
+import sys
+import glob
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# kolom Steps bisa sangat panjang, batas default csv (128 KB) tidak cukup
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+# Membaca CSV baris demi baris (tanpa memuat seluruh file / cache Arrow) dan hanya
+# mengembalikan kolom yang diminta. File tanpa kolom wajib dilewati dengan peringatan.
+def iter_csv_columns(
+    pattern: str,
+    required: Sequence[str],
+    optional: Sequence[str] = (),
+    encoding: str = "utf-8"
+) -> Iterator[Dict[str, Optional[str]]]:
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"Tidak ada file CSV yang cocok dengan '{pattern}'")
+
+    for path in paths:
+        with open(path, "r", encoding=encoding, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                continue
+
+            positions = {name: i for i, name in enumerate(header)}
+            missing = [c for c in required if c not in positions]
+            if missing:
+                logger.warning(f"Lewati '{path}': kolom {missing} tidak ada (kolom: {header})")
+                continue
+
+            wanted: List[str] = list(required) + [c for c in optional if c in positions]
+            for row in reader:
+                yield {
+                    name: row[positions[name]] if positions[name] < len(row) else None
+                    for name in wanted
+                }
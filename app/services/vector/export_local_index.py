@@ -0,0 +1,39 @@
+import os
+from dotenv import load_dotenv
+from pinecone import Pinecone
+from app.services.vector.local_index import LocalVectorIndex, LOCAL_INDEX_DIR
+
+# Menyalin seluruh vektor namespace 'recipes' dari Pinecone ke index lokal,
+# tanpa perlu embed ulang ke OpenAI.
+# Jalankan dari root repo: python -m app.services.vector.export_local_index
+
+load_dotenv()
+pineconeApiKey = os.getenv("PINECONE_API_KEY")
+
+index_name = "sicupang-rag-small"
+namespace = "recipes"
+fetch_batch_size = 100
+
+pc = Pinecone(api_key=pineconeApiKey)
+index = pc.Index(index_name)
+
+ids, vectors, metadatas = [], [], []
+
+for id_page in index.list(namespace=namespace):
+    for start in range(0, len(id_page), fetch_batch_size):
+        batch_ids = id_page[start:start + fetch_batch_size]
+        fetched = index.fetch(ids=batch_ids, namespace=namespace)
+
+        for vec_id in batch_ids:
+            vec = fetched.vectors.get(vec_id)
+            if vec is None:
+                continue
+            ids.append(vec_id)
+            vectors.append(vec.values)
+            metadatas.append(dict(vec.metadata or {}))
+
+    print(f"⏳ {len(ids)} vektor terunduh...")
+
+LocalVectorIndex.save(LOCAL_INDEX_DIR, ids, vectors, metadatas)
+
+print(f"✅ {len(ids)} vektor dari namespace '{namespace}' disimpan ke '{LOCAL_INDEX_DIR}'")
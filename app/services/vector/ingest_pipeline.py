@@ -0,0 +1,286 @@
+import os
+import json
+import hashlib
+import time
+import queue
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, List, Dict, Any, Optional, Set, NamedTuple, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class IngestBatch(NamedTuple):
+    number: int
+    ids: List[str]
+    texts: List[str]
+    metadatas: List[Dict[str, Any]]
+    hashes: List[str]
+
+
+class EmbeddedBatch(NamedTuple):
+    batch: IngestBatch
+    vectors: List[List[float]]
+
+
+def retry_with_backoff(
+    fn: Callable[[], T],
+    what: str,
+    retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0
+) -> T:
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            attempt += 1
+            if attempt > retries:
+                raise
+            # backoff eksponensial + jitter supaya worker tidak menyerbu bersamaan (rate limit)
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(f"⚠️ {what} gagal (percobaan {attempt}/{retries}): {e}. Ulangi dalam {delay:.1f}s")
+            time.sleep(delay)
+
+
+def row_id(*identity: str) -> str:
+    # ID stabil dari identitas resep (URL, atau judul+bahan jika URL kosong), bukan posisi baris
+    key = "\x1f".join(" ".join(str(part).split()).casefold() for part in identity)
+    return "recipe_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def row_hash(text: str, metadata: Dict[str, Any]) -> str:
+    payload = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# Manifest di disk: id -> hash konten untuk setiap baris yang sudah ter-upsert.
+# Run berikutnya hanya meng-embed baris baru/berubah dan menghapus id yang hilang.
+# Disimpan atomik setelah setiap batch, sehingga juga berfungsi sebagai checkpoint:
+# run yang terputus tidak mengulang baris yang sudah tercatat.
+# aliases memetakan id stabil -> id lama yang tetap dipakai (mis. recipe_00000001 yang
+# sudah dirujuk resep_makanan.id_resep_vektor_db), legacy_checked menandai migrasi id
+# lama sudah selesai.
+class IngestManifest:
+    def __init__(self, path: Optional[str], signature: Dict[str, Any]):
+        self.path = path
+        self.signature = signature
+        self.rows: Dict[str, str] = {}
+        self.aliases: Dict[str, str] = {}
+        self.legacy_checked = False
+        self.is_new = True
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("signature") == signature:
+                    self.rows = dict(state.get("rows", {}))
+                    self.aliases = dict(state.get("aliases", {}))
+                    self.legacy_checked = bool(state.get("legacy_checked", False))
+                    self.is_new = False
+                else:
+                    logger.info("Manifest dari index/model berbeda, index ulang penuh")
+            except Exception as e:
+                logger.warning(f"⚠️ Manifest tidak bisa dibaca, index ulang penuh: {e}")
+
+    def resolve(self, vec_id: str) -> str:
+        return self.aliases.get(vec_id, vec_id)
+
+    def is_current(self, vec_id: str, content_hash: str) -> bool:
+        return self.rows.get(vec_id) == content_hash
+
+    def record(self, ids: List[str], hashes: List[str]) -> None:
+        with self._lock:
+            self.rows.update(zip(ids, hashes))
+            self._write()
+
+    def forget(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for vec_id in ids:
+                self.rows.pop(vec_id, None)
+            self._write()
+
+    def adopt(self, aliases: Dict[str, str], rows: Dict[str, str]) -> None:
+        # id lama dipakai ulang; rows = id lama yang vektornya sudah sesuai konten (tidak perlu embed)
+        with self._lock:
+            self.aliases.update(aliases)
+            self.rows.update(rows)
+            self._write()
+
+    def mark_legacy_checked(self) -> None:
+        with self._lock:
+            self.legacy_checked = True
+            self._write()
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "signature": self.signature,
+                "rows": self.rows,
+                "aliases": self.aliases,
+                "legacy_checked": self.legacy_checked,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def match_legacy_ids(
+    legacy: Dict[str, Dict[str, Any]],
+    rows: Iterable[Tuple[str, str, str]]
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    # legacy: id lama -> {"hash", "title"}; rows: (id stabil, judul, hash konten).
+    # Cocokkan per hash konten dulu, lalu per judul yang unik di kedua sisi.
+    by_hash: Dict[str, List[str]] = {}
+    for legacy_id, info in sorted(legacy.items()):
+        by_hash.setdefault(info["hash"], []).append(legacy_id)
+
+    aliases: Dict[str, str] = {}
+    current: Dict[str, str] = {}
+    unmatched_rows = []
+    seen: Set[str] = set()
+    for vec_id, title, content_hash in rows:
+        if vec_id in seen:
+            continue
+        seen.add(vec_id)
+        candidates = by_hash.get(content_hash)
+        if candidates:
+            legacy_id = candidates.pop(0)
+            aliases[vec_id] = legacy_id
+            current[legacy_id] = content_hash
+        else:
+            unmatched_rows.append((vec_id, title))
+
+    used = set(aliases.values())
+    legacy_titles: Dict[str, List[str]] = {}
+    for legacy_id, info in legacy.items():
+        if legacy_id not in used:
+            legacy_titles.setdefault(info["title"], []).append(legacy_id)
+    row_titles: Dict[str, int] = {}
+    for _, title in unmatched_rows:
+        row_titles[title] = row_titles.get(title, 0) + 1
+
+    for vec_id, title in unmatched_rows:
+        # konten berubah: id lama tetap dipakai, vektornya di-embed ulang
+        if row_titles[title] == 1 and len(legacy_titles.get(title, [])) == 1:
+            aliases[vec_id] = legacy_titles[title][0]
+
+    # duplikat persis dari baris yang sama di index lama: tidak dihapus karena bisa saja
+    # dirujuk resep_makanan, dicatat sebagai alias ke dirinya sendiri
+    matched_hashes = set(current.values())
+    used = set(aliases.values())
+    for content_hash, leftover in by_hash.items():
+        if content_hash in matched_hashes:
+            for legacy_id in leftover:
+                if legacy_id not in used:
+                    aliases[legacy_id] = legacy_id
+    return aliases, current
+
+
+class IngestStats:
+    def __init__(self):
+        self.upserted = 0
+        self.failed = 0
+        self.failed_batches: List[int] = []
+        self._lock = threading.Lock()
+
+    def add(self, field: str, count: int, batch_number: Optional[int] = None) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+            if field == "failed" and batch_number is not None:
+                self.failed_batches.append(batch_number)
+
+
+# Pipeline dua tahap: worker embedding (paralel, jumlah batch in-flight dibatasi
+# max_in_flight) -> antrian -> worker upsert. Setiap tahap diulang dengan backoff;
+# batch yang tetap gagal dicatat dan tidak masuk manifest sehingga dicoba lagi di run
+# berikutnya. on_upserted dipanggil setelah batch berhasil di-upsert (mis. mencatat
+# manifest).
+def run_ingestion(
+    batches: Iterable[IngestBatch],
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    upsert_fn: Callable[[EmbeddedBatch], None],
+    embed_workers: int = 4,
+    upsert_workers: int = 2,
+    max_in_flight: int = 8,
+    retries: int = 5,
+    on_upserted: Optional[Callable[[EmbeddedBatch], None]] = None
+) -> IngestStats:
+    stats = IngestStats()
+    upsert_queue: "queue.Queue[Optional[EmbeddedBatch]]" = queue.Queue(maxsize=max_in_flight)
+
+    def embed(batch: IngestBatch) -> None:
+        try:
+            vectors = retry_with_backoff(
+                lambda: embed_fn(batch.texts), f"Embedding batch {batch.number}", retries=retries
+            )
+        except Exception as e:
+            logger.error(f"❌ Embedding batch {batch.number} gagal permanen: {e}")
+            stats.add("failed", len(batch.ids), batch.number)
+            return
+        upsert_queue.put(EmbeddedBatch(batch, vectors))
+
+    def upsert_loop() -> None:
+        while True:
+            item = upsert_queue.get()
+            if item is None:
+                upsert_queue.task_done()
+                return
+            try:
+                retry_with_backoff(
+                    lambda: upsert_fn(item), f"Upsert batch {item.batch.number}", retries=retries
+                )
+                if on_upserted is not None:
+                    on_upserted(item)
+                stats.add("upserted", len(item.batch.ids))
+                logger.info(f"✅ Batch {item.batch.number} ter-upsert ({len(item.batch.ids)} item). Total: {stats.upserted}")
+            except Exception as e:
+                logger.error(f"❌ Upsert batch {item.batch.number} gagal permanen: {e}")
+                stats.add("failed", len(item.batch.ids), item.batch.number)
+            finally:
+                upsert_queue.task_done()
+
+    upserters = [threading.Thread(target=upsert_loop, daemon=True) for _ in range(max(upsert_workers, 1))]
+    for t in upserters:
+        t.start()
+
+    in_flight: Set[Future] = set()
+    with ThreadPoolExecutor(max_workers=max(embed_workers, 1)) as pool:
+        for batch in batches:
+            # backpressure: jangan membaca batch baru selama in-flight penuh
+            while len(in_flight) >= max_in_flight:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            in_flight.add(pool.submit(embed, batch))
+
+        wait(in_flight)
+
+    for _ in upserters:
+        upsert_queue.put(None)
+    for t in upserters:
+        t.join()
+
+    return stats
+
+
+def batched(items: Iterable[T], size: int) -> Iterable[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
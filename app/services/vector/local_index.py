@@ -0,0 +1,155 @@
+import os
+import json
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services.vector.shard_store import ShardStore, is_shard_dir
+
+load_dotenv()
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").strip().lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vector_index/recipes")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+
+# Index cosine brute-force di dalam proses (matriks float32 mmap + sidecar metadata).
+# Hasil query meniru bentuk respons Pinecone (matches -> id, score, metadata).
+# index_dir boleh berupa satu embeddings.npy + metadata.json, atau direktori shard
+# hasil ingestion (ShardStore); tiap shard di-scan langsung dari mmap tanpa disalin.
+class LocalVectorIndex:
+    def __init__(self, index_dir: str = LOCAL_INDEX_DIR):
+        self.index_dir = index_dir
+        self._store: Optional[ShardStore] = None
+
+        if is_shard_dir(index_dir):
+            self._store = ShardStore(index_dir)
+            # (matriks, mask baris hidup) per shard
+            self._segments = [
+                (shard.vectors, self._store.live_mask(i))
+                for i, shard in enumerate(self._store.shards)
+            ]
+            self._size = len(self._store)
+            return
+
+        embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        metadata_path = os.path.join(index_dir, METADATA_FILE)
+
+        if not os.path.exists(embeddings_path) or not os.path.exists(metadata_path):
+            raise FileNotFoundError(f"Index lokal tidak ditemukan di '{index_dir}'")
+
+        # Vektor disimpan sudah ternormalisasi, jadi cosine cukup dot product
+        matrix = np.load(embeddings_path, mmap_mode="r")
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        if len(records) != matrix.shape[0]:
+            raise ValueError(
+                f"Jumlah metadata ({len(records)}) tidak sama dengan jumlah vektor ({matrix.shape[0]})"
+            )
+
+        self._ids: List[str] = [r["id"] for r in records]
+        self._metadatas: List[Dict[str, Any]] = [r.get("metadata", {}) for r in records]
+        self._segments = [(matrix, None)]
+        self._size = len(self._ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def warmup(self) -> None:
+        # baca seluruh halaman mmap sekali supaya query pertama tidak kena page fault
+        for matrix, _ in self._segments:
+            if matrix.shape[0]:
+                float(np.asarray(matrix).sum())
+
+    def _match(self, segment: int, row: int, score: float, include_metadata: bool) -> Dict[str, Any]:
+        if self._store is not None:
+            match = {"id": self._store.shards[segment].ids[row], "score": score}
+            if include_metadata:
+                match["metadata"] = self._store.metadata(segment, row)
+            return match
+
+        match = {"id": self._ids[row], "score": score}
+        if include_metadata:
+            match["metadata"] = self._metadatas[row]
+        return match
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 1,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
+        **kwargs
+    ) -> Dict[str, Any]:
+        if self._size == 0 or top_k <= 0:
+            return {"matches": [], "namespace": namespace or ""}
+
+        query_vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vec)
+        if norm == 0:
+            return {"matches": [], "namespace": namespace or ""}
+        query_vec = query_vec / norm
+
+        # top-k per segmen lalu digabung
+        candidates = []
+        for segment, (matrix, live) in enumerate(self._segments):
+            if matrix.shape[0] == 0:
+                continue
+            scores = matrix @ query_vec
+            if live is not None:
+                scores = np.where(live, scores, -np.inf)
+            k = min(top_k, scores.shape[0])
+            top_idx = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend(
+                (float(scores[row]), segment, int(row)) for row in top_idx if np.isfinite(scores[row])
+            )
+
+        candidates.sort(key=lambda c: -c[0])
+        matches = [
+            self._match(segment, row, score, include_metadata)
+            for score, segment, row in candidates[:top_k]
+        ]
+        return {"matches": matches, "namespace": namespace or ""}
+
+    @staticmethod
+    def save(
+        index_dir: str,
+        ids: List[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        if not (len(ids) == len(vectors) == len(metadatas)):
+            raise ValueError("Panjang ids, vectors, dan metadatas harus sama")
+
+        os.makedirs(index_dir, exist_ok=True)
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+        np.save(os.path.join(index_dir, EMBEDDINGS_FILE), matrix)
+        with open(os.path.join(index_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                [{"id": i, "metadata": m} for i, m in zip(ids, metadatas)],
+                f,
+                ensure_ascii=False
+            )
+
+
+def get_recipe_index(index_name: str, backend: Optional[str] = None):
+    backend = (backend or VECTOR_BACKEND).strip().lower()
+
+    if backend == "local":
+        return LocalVectorIndex(LOCAL_INDEX_DIR)
+
+    if backend == "pinecone":
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        return pc.Index(index_name)
+
+    raise ValueError(f"VECTOR_BACKEND tidak dikenal: '{backend}' (pilih 'pinecone' atau 'local')")
@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import threading
+from typing import List, Dict, Any, Iterable, Sequence, Tuple, NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_SHARD_DIR = os.getenv("EMBEDDING_SHARD_DIR", "vector_index/recipe_shards")
+EMBEDDING_SHARD_SIZE = int(os.getenv("EMBEDDING_SHARD_SIZE", "4096"))
+
+INGREDIENTS_FILE = "ingredients.txt"
+DELETED_FILE = "deleted.json"
+SHARD_META_RE = re.compile(r"^shard-(\d{5})\.json$")
+
+
+class Shard(NamedTuple):
+    number: int
+    vectors: np.ndarray
+    ids: List[str]
+    titles: List[str]
+    hashes: List[str]
+    offsets: List[int]
+    lengths: List[int]
+
+
+def _write_json_atomic(path: str, payload: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def is_shard_dir(path: str) -> bool:
+    return os.path.isdir(path) and any(SHARD_META_RE.match(name) for name in os.listdir(path))
+
+
+# Embedding resep sebagai shard .npy float32 (ternormalisasi L2, dibuka dengan mmap)
+# plus metadata ringkas per shard (id, judul, hash, offset+panjang bahan di
+# ingredients.txt). Shard hanya ditambah: baris yang berubah ditulis ulang di shard
+# baru dan versi terakhir per id yang dipakai; id yang dihapus dicatat di deleted.json
+# bersama jumlah shard saat itu, sehingga hanya baris di shard lebih lama yang mati.
+# File .json shard ditulis terakhir, jadi shard yang setengah jadi tidak pernah dibaca.
+class ShardStore:
+    def __init__(self, shard_dir: str = EMBEDDING_SHARD_DIR, shard_size: int = EMBEDDING_SHARD_SIZE):
+        self.shard_dir = shard_dir
+        self.shard_size = shard_size
+        os.makedirs(shard_dir, exist_ok=True)
+
+        self.shards: List[Shard] = []
+        # id -> (index shard, baris) versi terakhir yang masih hidup
+        self.live: Dict[str, Tuple[int, int]] = {}
+        self._deleted: Dict[str, int] = {}
+        self._buffer: List[Tuple[str, List[float], str, str, str]] = []
+        self._lock = threading.Lock()
+
+        deleted_path = os.path.join(shard_dir, DELETED_FILE)
+        if os.path.exists(deleted_path):
+            with open(deleted_path, "r", encoding="utf-8") as f:
+                self._deleted = json.load(f)
+
+        for name in sorted(os.listdir(shard_dir)):
+            match = SHARD_META_RE.match(name)
+            if match:
+                self._load_shard(int(match.group(1)))
+
+    def _load_shard(self, number: int) -> None:
+        base = os.path.join(self.shard_dir, f"shard-{number:05d}")
+        with open(f"{base}.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        shard = Shard(
+            number=number,
+            vectors=np.load(f"{base}.npy", mmap_mode="r"),
+            ids=meta["ids"],
+            titles=meta["titles"],
+            hashes=meta["hashes"],
+            offsets=meta["offsets"],
+            lengths=meta["lengths"],
+        )
+        shard_idx = len(self.shards)
+        self.shards.append(shard)
+
+        for row, vec_id in enumerate(shard.ids):
+            if self._deleted.get(vec_id, -1) > shard_idx:
+                continue
+            self.live[vec_id] = (shard_idx, row)
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def is_current(self, vec_id: str, content_hash: str) -> bool:
+        location = self.live.get(vec_id)
+        if location is None:
+            return False
+        shard_idx, row = location
+        return self.shards[shard_idx].hashes[row] == content_hash
+
+    def live_mask(self, shard_idx: int) -> np.ndarray:
+        mask = np.zeros(len(self.shards[shard_idx].ids), dtype=bool)
+        for vec_id in self.shards[shard_idx].ids:
+            location = self.live.get(vec_id)
+            if location is not None and location[0] == shard_idx:
+                mask[location[1]] = True
+        return mask
+
+    def ingredients(self, shard_idx: int, row: int) -> str:
+        shard = self.shards[shard_idx]
+        with open(os.path.join(self.shard_dir, INGREDIENTS_FILE), "rb") as f:
+            f.seek(shard.offsets[row])
+            return f.read(shard.lengths[row]).decode("utf-8")
+
+    def metadata(self, shard_idx: int, row: int) -> Dict[str, Any]:
+        # bentuk sama dengan metadata Pinecone namespace 'recipes'
+        return {"title": self.shards[shard_idx].titles[row], "content": self.ingredients(shard_idx, row)}
+
+    def append(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        titles: Sequence[str],
+        ingredients: Sequence[str],
+        hashes: Sequence[str]
+    ) -> None:
+        with self._lock:
+            self._buffer.extend(zip(ids, vectors, titles, ingredients, hashes))
+            while len(self._buffer) >= self.shard_size:
+                self._write_shard(self._buffer[:self.shard_size])
+                self._buffer = self._buffer[self.shard_size:]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._write_shard(self._buffer)
+                self._buffer = []
+
+    def _write_shard(self, rows: List[Tuple[str, List[float], str, str, str]]) -> None:
+        number = self.shards[-1].number + 1 if self.shards else 0
+        base = os.path.join(self.shard_dir, f"shard-{number:05d}")
+
+        matrix = np.asarray([r[1] for r in rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        np.save(f"{base}.npy", matrix / norms)
+
+        offsets, lengths = [], []
+        with open(os.path.join(self.shard_dir, INGREDIENTS_FILE), "ab") as f:
+            offset = f.tell()
+            for r in rows:
+                data = r[3].encode("utf-8")
+                f.write(data)
+                offsets.append(offset)
+                lengths.append(len(data))
+                offset += len(data)
+
+        _write_json_atomic(f"{base}.json", {
+            "ids": [r[0] for r in rows],
+            "titles": [r[2] for r in rows],
+            "hashes": [r[4] for r in rows],
+            "offsets": offsets,
+            "lengths": lengths,
+        })
+        self._load_shard(number)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            shard_count = len(self.shards)
+            for vec_id in ids:
+                if self.live.pop(vec_id, None) is not None:
+                    self._deleted[vec_id] = shard_count
+            _write_json_atomic(os.path.join(self.shard_dir, DELETED_FILE), self._deleted)
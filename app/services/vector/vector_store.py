@@ -1,12 +1,17 @@
 import os
 import logging
 from dotenv import load_dotenv
-from datasets import load_dataset
 from langchain_openai import OpenAIEmbeddings
 from pinecone import Pinecone
 # Asumsi fungsi ini menginisialisasi indeks, ganti dengan import yang sesuai
 from load_pinecone import loadPinecone 
-import time
+from csv_reader import iter_csv_columns
+from shard_store import ShardStore, EMBEDDING_SHARD_DIR
+from ingest_pipeline import (
+    IngestBatch, IngestManifest, run_ingestion, retry_with_backoff, batched, row_id, row_hash,
+    match_legacy_ids
+)
+import re
 import sys
 
 # Konfigurasi Logging
@@ -30,22 +35,8 @@ if not pineconeApiKey or not openAIApiKey:
     logger.error("FATAL: Missing required API keys in environment variables")
     sys.exit(1)
 
-# Memuat Dataset
-try: 
-    ds = load_dataset(
-        "csv",
-        data_files={"train": "datasets/*.csv"},
-        delimiter=",",
-        encoding="utf-8"
-    )["train"]
-    logger.info(f"Dataset loaded successfully. Total rows: {len(ds)}")
-except Exception as e:
-    logger.error(f"Failed to load dataset: {e}")
-    sys.exit(1)
-
-missing = [c for c in (TITLE_COL, ING_COL) if c not in ds.column_names]
-if missing:
-    raise KeyError(f"Required columns not found in CSV: {missing}. Available columns: {ds.column_names}")
+# File dataset resep (nutrition.csv tidak punya kolom Title/Ingredients)
+DATA_FILES = os.getenv("INGEST_DATA_FILES", "datasets/dataset-*.csv")
 
 # Inisialisasi Koneksi dan Embeddings
 try:
@@ -57,30 +48,22 @@ except Exception as e:
     logger.error(f"Failed to initialize services: {e}")
     sys.exit(1)
 
-batch_size = 100
-batch_ids, batch_texts, batch_metas = [], [], []
-processed_count = 0
-error_count = 0
-
-def flush_batch():
-    global processed_count, error_count
-    if not batch_texts:
-        return
-    try:
-        logger.info(f"Generating embeddings for batch of {len(batch_texts)} items...")
-        vectors = embed.embed_documents(batch_texts)
-        upsert_data = list(zip(batch_ids, vectors, batch_metas))
-        logger.info(f"Upserting batch to Pinecone namespace '{NAMESPACE}'...")
-        index.upsert(vectors=upsert_data, namespace=NAMESPACE)
-        processed_count += len(batch_texts)
-        logger.info(f"✅ Batch upserted successfully. Total processed: {processed_count}")
-    except Exception as e:
-        error_count += len(batch_texts)
-        logger.error(f"❌ Failed to upsert batch: {e}")
-    finally:
-        batch_ids.clear()
-        batch_texts.clear()
-        batch_metas.clear()
+# --- PARAMETER PIPELINE ---
+URL_COL = "URL"
+batch_size = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+embed_workers = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+upsert_workers = int(os.getenv("INGEST_UPSERT_WORKERS", "2"))
+max_in_flight = int(os.getenv("INGEST_MAX_IN_FLIGHT", "8"))
+max_retries = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+manifest_path = os.getenv("INGEST_MANIFEST_PATH", "cache/ingest_recipes.manifest.json")
+delete_batch_size = 1000
+fetch_batch_size = 100
+# salinan lokal embedding (shard .npy) supaya rebuild/eksperimen tidak perlu embed ulang
+shards_enabled = os.getenv("EMBEDDING_SHARDS_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# ID lama berbasis posisi baris (recipe_00000001), masih dirujuk resep_makanan.id_resep_vektor_db.
+# Dipakai ulang untuk baris dataset yang sama (alias di manifest); hanya yang tidak punya
+# pasangan baris yang dihapus.
+LEGACY_ID_RE = re.compile(r"^recipe_\d{8}$")
 
 def clean_text(text):
     if text is None:
@@ -89,54 +72,232 @@ def clean_text(text):
         text = ", ".join(str(x).strip() for x in text if x)
     return str(text).strip()
 
-logger.info("Starting dataset processing...")
+manifest = IngestManifest(
+    manifest_path,
+    signature={"index": index_name, "namespace": NAMESPACE, "model": model_name}
+)
+shards = ShardStore(EMBEDDING_SHARD_DIR) if shards_enabled else None
+seen_ids = set()
+row_count = 0
+unchanged_count = 0
+duplicate_count = 0
+backfilled_count = 0
 
-for i, row in enumerate(ds):
-    try:
+def iter_rows():
+    # (id stabil, teks embedding, metadata, hash konten) per baris dataset
+    rows = iter_csv_columns(DATA_FILES, required=(TITLE_COL, ING_COL), optional=(URL_COL,))
+    for i, row in enumerate(rows):
         title = clean_text(row.get(TITLE_COL))
         ingredients = clean_text(row.get(ING_COL))
-        
+
         if not title:
-            logger.warning(f"Skipping row {i}: Title is empty")
+            yield i, None
             continue
-        
+
+        url = clean_text(row.get(URL_COL))
+        vec_id = row_id(url) if url else row_id(title, ingredients)
+
         # 1. Konten yang di-embed (Vektor)
-        vector_content = title 
-        
+        vector_content = title
         # 2. Metadata (Retrieval Content)
         metadata = {
             "title": title,
             # KUNCI KRITIS: Menggunakan 'content' untuk menyimpan Ingredients, 
             # agar sesuai dengan text_key="content" di Retrieval
-            "content": ingredients, 
+            "content": ingredients,
         }
-        
-        batch_ids.append(f"recipe_{i:08d}")
-        batch_texts.append(vector_content) 
-        batch_metas.append(metadata)
-
-        if len(batch_texts) >= batch_size:
-            flush_batch()
-            time.sleep(0.1)
+        yield i, (vec_id, vector_content, metadata, row_hash(vector_content, metadata))
+
+def iter_batches():
+    # satu lintasan streaming: hanya baris baru/berubah (hash beda dari manifest) yang
+    # masuk batch, jadi memori tetap sebesar batch in-flight (+ set id untuk deteksi hapus)
+    global row_count, unchanged_count, duplicate_count
+    pending = []
+    backfill = []
+    number = 0
+
+    for i, parsed in iter_rows():
+        row_count += 1
+        if parsed is None:
+            logger.warning(f"Skipping row {i}: Title is empty")
+            continue
+
+        vec_id, vector_content, metadata, content_hash = parsed
+        vec_id = manifest.resolve(vec_id)
+        if vec_id in seen_ids:
+            duplicate_count += 1
+            continue
+        seen_ids.add(vec_id)
+
+        entry = (vec_id, vector_content, metadata, content_hash)
+        if manifest.is_current(vec_id, content_hash):
+            if shards is None or shards.is_current(vec_id, content_hash):
+                unchanged_count += 1
+                continue
+            # sudah ada di Pinecone, belum ada di shard lokal: salin vektornya, tanpa embed ulang
+            backfill.append(entry)
+            if len(backfill) >= fetch_batch_size:
+                pending.extend(backfill_shards(backfill))
+                backfill = []
+        else:
+            pending.append(entry)
+
+        while len(pending) >= batch_size:
+            yield make_batch(number, pending[:batch_size])
+            number += 1
+            pending = pending[batch_size:]
+
+    if backfill:
+        pending.extend(backfill_shards(backfill))
+    for chunk in batched(pending, batch_size):
+        yield make_batch(number, chunk)
+        number += 1
+
+def backfill_shards(rows):
+    # mengembalikan baris yang vektornya tidak bisa diambil dari Pinecone (di-embed ulang)
+    global backfilled_count
+    try:
+        fetched = retry_with_backoff(
+            lambda: index.fetch(ids=[r[0] for r in rows], namespace=NAMESPACE),
+            f"Fetch {len(rows)} vektor untuk shard",
+            retries=max_retries
+        )
+        found = [(r, fetched.vectors[r[0]].values) for r in rows if r[0] in fetched.vectors]
+        if found:
+            shards.append(
+                [r[0] for r, _ in found],
+                [values for _, values in found],
+                [r[2]["title"] for r, _ in found],
+                [r[2]["content"] for r, _ in found],
+                [r[3] for r, _ in found]
+            )
     except Exception as e:
-        logger.error(f"Error processing row {i}: {e}")
-        error_count += 1
-        continue
+        logger.warning(f"⚠️ Gagal menyalin {len(rows)} vektor dari Pinecone ke shard, embed ulang: {e}")
+        return rows
+
+    backfilled_count += len(found)
+    found_ids = {r[0] for r, _ in found}
+    return [r for r in rows if r[0] not in found_ids]
+
+def make_batch(number, rows):
+    ids, texts, metas, hashes = (list(col) for col in zip(*rows))
+    return IngestBatch(number, ids, texts, metas, hashes)
+
+def upsert_batch(embedded):
+    batch = embedded.batch
+    index.upsert(vectors=list(zip(batch.ids, embedded.vectors, batch.metadatas)), namespace=NAMESPACE)
+
+def record_batch(embedded):
+    # shard dulu: jika gagal, manifest tidak mencatat batch ini dan run berikutnya mengulangnya
+    batch = embedded.batch
+    if shards is not None:
+        shards.append(
+            batch.ids,
+            embedded.vectors,
+            [m["title"] for m in batch.metadatas],
+            [m["content"] for m in batch.metadatas],
+            batch.hashes
+        )
+    manifest.record(batch.ids, batch.hashes)
+
+def delete_ids(ids):
+    for chunk in batched(sorted(ids), delete_batch_size):
+        retry_with_backoff(
+            lambda: index.delete(ids=chunk, namespace=NAMESPACE),
+            f"Delete {len(chunk)} vektor",
+            retries=max_retries
+        )
+        manifest.forget(chunk)
+
+def list_legacy_ids():
+    return [
+        vec_id
+        for id_page in index.list(prefix="recipe_", namespace=NAMESPACE)
+        for vec_id in id_page
+        if LEGACY_ID_RE.match(vec_id)
+    ]
+
+def fetch_legacy(legacy_ids):
+    # hash konten dihitung dari metadata vektor lama (format metadata tidak berubah)
+    legacy = {}
+    for chunk in batched(legacy_ids, fetch_batch_size):
+        fetched = retry_with_backoff(
+            lambda: index.fetch(ids=chunk, namespace=NAMESPACE),
+            f"Fetch {len(chunk)} vektor lama",
+            retries=max_retries
+        )
+        for vec_id in chunk:
+            vec = fetched.vectors.get(vec_id)
+            if vec is None:
+                continue
+            metadata = {
+                "title": clean_text((vec.metadata or {}).get("title")),
+                "content": clean_text((vec.metadata or {}).get("content")),
+            }
+            legacy[vec_id] = {"hash": row_hash(metadata["title"], metadata), "title": metadata["title"]}
+    return legacy
+
+legacy_ids = []
+if not manifest.legacy_checked:
+    legacy_ids = list_legacy_ids()
+    if legacy_ids and not manifest.aliases:
+        logger.info(f"Mencocokkan {len(legacy_ids)} vektor ID lama dengan baris dataset...")
+        aliases, current = match_legacy_ids(
+            fetch_legacy(legacy_ids),
+            ((parsed[0], parsed[2]["title"], parsed[3]) for _, parsed in iter_rows() if parsed is not None)
+        )
+        manifest.adopt(aliases, current)
+        logger.info(
+            f"♻️ {len(set(aliases.values()))} ID lama dipertahankan ({len(current)} tanpa embed ulang), "
+            f"{len(set(legacy_ids) - set(aliases.values()))} tanpa pasangan baris akan dihapus"
+        )
+
+logger.info("Starting dataset processing...")
+
+stats = run_ingestion(
+    iter_batches(),
+    embed_fn=embed.embed_documents,
+    upsert_fn=upsert_batch,
+    embed_workers=embed_workers,
+    upsert_workers=upsert_workers,
+    max_in_flight=max_in_flight,
+    retries=max_retries,
+    on_upserted=record_batch,
+)
+processed_count = stats.upserted
+error_count = stats.failed
+
+# resep yang sudah tidak ada di dataset
+removed_ids = set(manifest.rows) - seen_ids
+if not manifest.legacy_checked and error_count == 0:
+    # ID lama tanpa pasangan baris dataset, dihapus setelah run tanpa error
+    removed_ids |= set(legacy_ids) - set(manifest.aliases.values())
+if removed_ids:
+    logger.info(f"Menghapus {len(removed_ids)} vektor resep yang sudah tidak ada di dataset...")
+    delete_ids(removed_ids)
+if not manifest.legacy_checked and error_count == 0:
+    manifest.mark_legacy_checked()
 
-# Flush sisa data
-flush_batch()
+if shards is not None:
+    shards.flush()
+    shards.delete(set(shards.live) - seen_ids)
+    logger.info(f"💾 Shard embedding lokal: {len(shards)} vektor di '{EMBEDDING_SHARD_DIR}'")
 
 logger.info("=" * 50)
 logger.info("UPSERT SUMMARY")
 logger.info("=" * 50)
 logger.info(f"✅ Total rows processed successfully: {processed_count}")
 logger.info(f"❌ Total errors: {error_count}")
-logger.info(f"📊 Total dataset rows: {len(ds)}")
+logger.info(f"⏭️ Unchanged (manifest): {unchanged_count}")
+logger.info(f"📥 Disalin dari Pinecone ke shard: {backfilled_count}")
+logger.info(f"🗑️ Removed: {len(removed_ids)}")
+logger.info(f"♊ Duplicate rows: {duplicate_count}")
+logger.info(f"📊 Total dataset rows: {row_count}")
 logger.info(f"🎯 Namespace: '{NAMESPACE}'")
 logger.info(f"🔍 Index: '{index_name}'")
 logger.info("=" * 50)
 
 if error_count > 0:
-    logger.warning(f"⚠️ {error_count} rows had errors during processing")
+    logger.warning(f"⚠️ {error_count} rows had errors during processing, jalankan ulang untuk mengulang baris yang belum tercatat di manifest")
 
 print(f"✅ Upsert completed! Processed {processed_count} recipes to namespace '{NAMESPACE}'")
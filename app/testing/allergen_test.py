@@ -0,0 +1,35 @@
+from app.helper.allergen import parse_alergi, normalize_alergi, contains_allergen
+
+# Uji parsing alergi untuk rekomendasi bahan (offline).
+# Jalankan dari root repo: python -m app.testing.allergen_test
+
+
+def test_alergi_terhadap():
+    # "alergi terhadap" harus dibuang utuh, bukan hanya "alergi"
+    for text in ["alergi terhadap udang", "Alergi Terhadap  Udang", "alergi udang", "udang", "alergi: udang"]:
+        terms = parse_alergi(text)
+        assert terms == ["udang", "ebi", "rebon", "terasi"], f"{text!r} -> {terms}"
+        assert contains_allergen("Udang Segar", terms)
+        assert not contains_allergen("Ayam Kampung", terms)
+
+    terms = parse_alergi("alergi terhadap kacang tanah dan telur")
+    assert contains_allergen("Kacang Tanah Kupas", terms) and contains_allergen("Telur Ayam", terms)
+
+
+def test_tanpa_alergi():
+    for text in ["", "-", "tidak ada", "tidak ada alergi", "Tidak Alergi", "tidak punya alergi", "tanpa alergi"]:
+        assert parse_alergi(text) == [], f"{text!r} -> {parse_alergi(text)}"
+        assert normalize_alergi(text) == ""
+
+
+def test_normalize():
+    assert normalize_alergi("telur, alergi terhadap udang") == normalize_alergi("udang dan telur")
+    # batas kata: "mi" tidak boleh cocok dengan "Minyak"
+    assert not contains_allergen("Minyak Goreng", parse_alergi("gluten"))
+
+
+if __name__ == "__main__":
+    test_alergi_terhadap()
+    test_tanpa_alergi()
+    test_normalize()
+    print("✅ Parsing alergi sesuai")
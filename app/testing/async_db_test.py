@@ -0,0 +1,85 @@
+import os
+import asyncio
+import tempfile
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.models.food_recipe import (
+    FoodRecipe, get_resep_by_nama_async, get_resep_by_nama_bulk_async, InsertFoodRecipeAsync
+)
+from app.db.models.household_food import HouseholdFood, InsertHouseholdFoodBulkAsync
+from app.db.models.food_ingredient import get_pangan_by_nama_fuzzy_async
+
+# Uji jalur async model helper secara lokal dengan aiosqlite (tanpa MySQL).
+# Jalankan dari root repo: python -m app.testing.async_db_test
+
+# tabel pangan & pangan_keluarga dibuat manual karena FK-nya menunjuk tabel yang tidak dimodelkan
+DDL = [
+    """CREATE TABLE pangan (
+        id_pangan INTEGER PRIMARY KEY,
+        nama_pangan VARCHAR(191) NOT NULL,
+        gram NUMERIC(10, 2) NOT NULL, kalori NUMERIC(10, 2) NOT NULL,
+        lemak NUMERIC(10, 2) NOT NULL, karbohidrat NUMERIC(10, 2) NOT NULL,
+        protein NUMERIC(10, 2) NOT NULL,
+        id_jenis_pangan INTEGER NOT NULL, id_takaran INTEGER NOT NULL,
+        referensi_urt VARCHAR(255) NOT NULL, referensi_gram_berat NUMERIC(10, 2) NOT NULL
+    )""",
+    """CREATE TABLE pangan_keluarga (
+        id_pangan_keluarga INTEGER PRIMARY KEY,
+        id_pangan INTEGER NOT NULL, id_keluarga INTEGER NOT NULL,
+        urt NUMERIC(8, 2) NOT NULL, tanggal DATE NOT NULL
+    )""",
+    """INSERT INTO pangan VALUES
+        (1, 'Beras Putih Mentah', 100, 360, 0.7, 79, 6.8, 1, 1, '1 gelas', 150),
+        (2, 'Ikan Gurami', 100, 96, 1.3, 0, 18, 2, 1, '1 potong', 50),
+        (3, 'Bawang Merah', 100, 39, 0.3, 9, 1.5, 3, 2, '1 butir', 5)""",
+]
+
+
+async def main():
+    db_path = os.path.join(tempfile.mkdtemp(), "async_db_test.sqlite3")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+
+    async with engine.begin() as conn:
+        for statement in DDL:
+            await conn.execute(text(statement))
+        await conn.run_sync(FoodRecipe.__table__.create)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await InsertFoodRecipeAsync(FoodRecipe(
+            nama_olahan="rawon",
+            id_resep_vektor_db="recipe_00000001",
+            uraian_bahan={"standar_porsi": 4.0, "bahan_parsed": []},
+            standar_porsi=4.0,
+        ), session)
+
+        resep = await get_resep_by_nama_async("rawon", session)
+        assert resep is not None and resep.id_resep_vektor_db == "recipe_00000001"
+
+        hits = await get_resep_by_nama_bulk_async(["rawon", "soto", "rawon"], session)
+        assert list(hits.keys()) == ["rawon"]
+
+        pangan = await get_pangan_by_nama_fuzzy_async("ikan gurami", session)
+        assert pangan is not None and pangan.id_pangan == 2 and pangan.nama_pangan == "Ikan Gurami"
+
+        pangan = await get_pangan_by_nama_fuzzy_async("gurami", session)
+        assert pangan is not None and pangan.id_pangan == 2
+
+        # di bawah FUZZY_SCORE_THRESHOLD tidak boleh dipaksa cocok
+        assert await get_pangan_by_nama_fuzzy_async("kerupuk udang", session) is None
+
+        inserted = await InsertHouseholdFoodBulkAsync([
+            HouseholdFood(id_pangan=1, id_keluarga=101, urt=Decimal("1.33"), tanggal=date.today()),
+            HouseholdFood(id_pangan=3, id_keluarga=101, urt=Decimal("2.00"), tanggal=date.today()),
+        ], session)
+        count = (await session.execute(text("SELECT COUNT(*) FROM pangan_keluarga"))).scalar_one()
+        assert inserted == 2 and count == 2
+
+    await engine.dispose()
+    print("✅ Jalur async (aiosqlite) berjalan normal")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
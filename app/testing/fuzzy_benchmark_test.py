@@ -0,0 +1,81 @@
+import csv
+import glob
+import time
+from fuzzywuzzy import fuzz
+from fuzzywuzzy import process
+from app.helper.fuzzy_index import BigramIndex
+from app.db.models.food_ingredient import FUZZY_SCORE_THRESHOLD
+
+# Micro-benchmark: scan penuh extractOne vs shortlist BigramIndex.
+# Offline, memakai nama di datasets/nutrition.csv sebagai pengganti tabel pangan
+# dan daftar bahan resep sebagai query.
+# Jalankan dari root repo: python -m app.testing.fuzzy_benchmark_test
+
+MAX_QUERIES = 2000
+
+
+def load_names():
+    with open("datasets/nutrition.csv", encoding="utf-8") as f:
+        return [row["name"] for row in csv.DictReader(f) if row.get("name")]
+
+
+def load_queries():
+    queries = []
+    for path in sorted(glob.glob("datasets/dataset-*.csv")):
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                queries.extend(b.strip() for b in (row.get("Ingredients") or "").split("--") if b.strip())
+                if len(queries) >= MAX_QUERIES:
+                    return queries[:MAX_QUERIES]
+    return queries
+
+
+def match_full_scan(query, names):
+    best = process.extractOne(query, names, scorer=fuzz.token_set_ratio)
+    if best is None or best[1] < FUZZY_SCORE_THRESHOLD:
+        return None
+    return best[0]
+
+
+def match_indexed(query, index):
+    candidates = index.candidates(query)
+    if not candidates:
+        return None
+    best = process.extractOne(query, candidates, scorer=fuzz.token_set_ratio)
+    if best is None or best[1] < FUZZY_SCORE_THRESHOLD:
+        return None
+    return best[0]
+
+
+if __name__ == "__main__":
+    names = load_names()
+    queries = load_queries()
+    print(f"📊 {len(names)} nama pangan, {len(queries)} query bahan")
+
+    start = time.perf_counter()
+    index = BigramIndex(names, min_score=FUZZY_SCORE_THRESHOLD)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [match_full_scan(q, names) for q in queries]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [match_indexed(q, index) for q in queries]
+    indexed_time = time.perf_counter() - start
+
+    shortlist = sum(len(index.candidates(q)) for q in queries) / max(len(queries), 1)
+    mismatches = [(q, e, a) for q, e, a in zip(queries, expected, actual) if e != a]
+
+    print(f"⏱️ Build index      : {build_time * 1000:.1f} ms")
+    print(f"⏱️ Scan penuh       : {full_time * 1000 / len(queries):.3f} ms/query")
+    print(f"⏱️ Dengan index     : {indexed_time * 1000 / len(queries):.3f} ms/query")
+    print(f"🚀 Speedup          : {full_time / indexed_time:.1f}x")
+    print(f"🔎 Rata-rata shortlist: {shortlist:.1f} dari {len(names)} nama")
+
+    if mismatches:
+        for q, e, a in mismatches[:10]:
+            print(f"❌ Beda hasil untuk '{q}': scan penuh={e}, index={a}")
+        raise SystemExit(1)
+
+    print("✅ Hasil identik dengan scan penuh untuk semua query")
@@ -0,0 +1,88 @@
+import math
+import tempfile
+
+from app.services.vector.local_index import LocalVectorIndex
+from app.services.vector.shard_store import ShardStore
+
+# Uji LocalVectorIndex secara offline dengan beberapa vektor yang sudah diketahui
+# (tanpa Pinecone / OpenAI).
+# Jalankan dari root repo: python -m app.testing.local_index_test
+
+IDS = ["recipe_rawon", "recipe_soto", "recipe_gulai", "recipe_pecel"]
+VECTORS = [
+    [1.0, 0.0, 0.0],
+    [3.0, 3.0, 0.0],   # tidak ternormalisasi, cosine harus tetap benar
+    [0.0, 1.0, 0.0],
+    [0.0, 0.0, 2.0],
+]
+METADATAS = [
+    {"title": "Rawon", "content": "daging sapi--kluwek"},
+    {"title": "Soto", "content": "ayam--kunyit"},
+    {"title": "Gulai", "content": "kambing--santan"},
+    {"title": "Pecel", "content": "kangkung--kacang tanah"},
+]
+
+
+def assert_close(actual, expected, what):
+    assert math.isclose(actual, expected, abs_tol=1e-5), f"{what}: {actual} != {expected}"
+
+
+def test_flat_index():
+    index_dir = tempfile.mkdtemp()
+    LocalVectorIndex.save(index_dir, IDS, VECTORS, METADATAS)
+    index = LocalVectorIndex(index_dir)
+    assert len(index) == 4
+
+    result = index.query(vector=[1.0, 0.2, 0.0], top_k=3, namespace="recipes")
+    assert result["namespace"] == "recipes"
+    assert [m["id"] for m in result["matches"]] == ["recipe_rawon", "recipe_soto", "recipe_gulai"]
+
+    norm = math.sqrt(1.0 ** 2 + 0.2 ** 2)
+    assert_close(result["matches"][0]["score"], 1.0 / norm, "skor rawon")
+    assert_close(result["matches"][1]["score"], 1.2 / (norm * math.sqrt(2)), "skor soto")
+    assert_close(result["matches"][2]["score"], 0.2 / norm, "skor gulai")
+    assert result["matches"][0]["metadata"] == METADATAS[0]
+
+    # skala query tidak berpengaruh pada cosine
+    scaled = index.query(vector=[0.0, 0.0, 5.0], top_k=1)
+    assert scaled["matches"][0]["id"] == "recipe_pecel"
+    assert_close(scaled["matches"][0]["score"], 1.0, "skor pecel")
+
+    bare = index.query(vector=[0.0, 1.0, 0.0], top_k=1, include_metadata=False)
+    assert bare["matches"] == [{"id": "recipe_gulai", "score": bare["matches"][0]["score"]}]
+
+    assert len(index.query(vector=[1.0, 0.0, 0.0], top_k=10)["matches"]) == 4
+    assert index.query(vector=[0.0, 0.0, 0.0], top_k=1)["matches"] == []
+
+
+def test_shard_index():
+    shard_dir = tempfile.mkdtemp()
+    store = ShardStore(shard_dir, shard_size=2)
+    store.append(
+        IDS, VECTORS,
+        [m["title"] for m in METADATAS], [m["content"] for m in METADATAS],
+        ["h1", "h2", "h3", "h4"]
+    )
+    store.flush()
+    # gulai berubah (versi baru di shard berikutnya), pecel dihapus
+    store.append(["recipe_gulai"], [[-1.0, 0.0, 0.0]], ["Gulai"], ["kambing--santan--cabai"], ["h3b"])
+    store.flush()
+    store.delete(["recipe_pecel"])
+
+    index = LocalVectorIndex(shard_dir)
+    assert len(index) == 3
+
+    result = index.query(vector=[-1.0, 0.0, 0.0], top_k=1)
+    assert result["matches"][0]["id"] == "recipe_gulai"
+    assert_close(result["matches"][0]["score"], 1.0, "skor gulai versi baru")
+    assert result["matches"][0]["metadata"] == {"title": "Gulai", "content": "kambing--santan--cabai"}
+
+    # versi lama gulai & pecel yang dihapus tidak boleh muncul
+    ids = [m["id"] for m in index.query(vector=[0.0, 1.0, 1.0], top_k=10)["matches"]]
+    assert sorted(ids) == ["recipe_gulai", "recipe_rawon", "recipe_soto"]
+
+
+if __name__ == "__main__":
+    test_flat_index()
+    test_shard_index()
+    print("✅ LocalVectorIndex: urutan top-k, skor, dan metadata sesuai")
@@ -0,0 +1,24 @@
+from app.helper.takaran import unit_grams
+
+# Uji konversi takaran harga ke gram untuk optimizer budget (offline).
+# Jalankan dari root repo: python -m app.testing.takaran_test
+
+if __name__ == "__main__":
+    assert unit_grams("kg") == 1000
+    assert unit_grams("Kilogram") == 1000
+    assert unit_grams("ons") == 100
+    assert unit_grams("250 gram") == 250
+    assert unit_grams("1/2 kg") == 500
+    assert unit_grams("0,5 kg") == 500
+
+    # satuan hitungan memakai referensi_urt pangan yang satuannya sama
+    assert unit_grams("butir", "1 butir", 60) == 60
+    assert unit_grams("10 butir", "2 butir", 120) == 600
+    assert unit_grams("ikat", "1 butir", 60) is None
+
+    # satuan volume / tidak dikenal tidak dikonversi
+    assert unit_grams("liter") is None
+    assert unit_grams("ml") is None
+    assert unit_grams("") is None
+
+    print("✅ Konversi takaran sesuai")
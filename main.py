@@ -1,13 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes import food_recommendation, chatbot, ingredient_extract
+from app.services.container import ServiceContainer, SERVICE_WARMUP
 from app.db.models.family import Family 
 from app.db.models.household_food import HouseholdFood
 from app.db.models.food_ingredient import FoodIngredient
 from app.db.models.food_recipe import FoodRecipe
 
 
-app = FastAPI(title="Emolog API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # satu set service per worker, warmup selesai sebelum worker menerima request
+    services = ServiceContainer()
+    if SERVICE_WARMUP:
+        await services.warmup()
+    app.state.services = services
+    yield
+    await services.aclose()
+
+
+app = FastAPI(title="Emolog API", lifespan=lifespan)
 
 app.include_router(food_recommendation.router, prefix="/api")
 app.include_router(chatbot.router, prefix="/api")
-app.include_router(ingredient_extract.router, prefix="/api")
\ No newline at end of file
+app.include_router(ingredient_extract.router, prefix="/api")